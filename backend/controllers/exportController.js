@@ -1,6 +1,7 @@
 const db = require('../config/db.js');
 const { Parser } = require('json2csv');
 const { dataAccessLog } = require('../middleware/loggingMiddleware');
+const { sdgFilter } = require('../utils/sdgMask');
 
 /**
  * Export faculty list to CSV
@@ -12,8 +13,9 @@ exports.exportFacultyCSV = (req, res) => {
     const params = [];
     
     if (sdg) {
-        filters.push(`REPLACE(LOWER(pi.sustainable_development_goals), ' ', '') LIKE ?`);
-        params.push(`%${sdg.toLowerCase().replace(/\s+/g, '')}%`);
+        const { clause, param } = sdgFilter(sdg);
+        filters.push(clause);
+        params.push(param);
     }
     
     if (domain) {
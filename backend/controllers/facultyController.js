@@ -1,4 +1,5 @@
 const db = require('../config/db');
+const { sdgFilter } = require('../utils/sdgMask');
 
 exports.getAllFaculty = (req, res) => {
     const { sdg, domain, year } = req.query;
@@ -8,11 +9,9 @@ exports.getAllFaculty = (req, res) => {
 
     // ✅ Fixed: Using parameterized queries to prevent SQL injection
     if (sdg) {
-        filters.push(`
-            REPLACE(LOWER(pi.sustainable_development_goals), ' ', '') 
-            LIKE ?
-        `);
-        params.push(`%${sdg.toLowerCase().replace(/\s+/g, '')}%`);
+        const { clause, param } = sdgFilter(sdg);
+        filters.push(clause);
+        params.push(param);
     }
 
     if (domain) {
@@ -49,11 +48,23 @@ exports.getAllFaculty = (req, res) => {
             GROUP_CONCAT(DISTINCT pi.sustainable_development_goals SEPARATOR '|') AS all_sdgs,
             GROUP_CONCAT(DISTINCT pi.qs_subject_field_name SEPARATOR '|') AS all_domains,
 
-            COUNT(DISTINCT p.doi) AS filtered_docs
+            COUNT(DISTINCT p.doi) AS filtered_docs,
+
+            -- paper_faculty is built at SciVal ingest (python_files/faculty_attribution.py)
+            MAX(pf.first_author_docs) AS first_author_docs,
+            MAX(pf.corresponding_docs) AS corresponding_docs
 
         FROM users u
         LEFT JOIN papers p ON u.scopus_id = p.scopus_id
         LEFT JOIN paper_insights pi ON p.doi = pi.doi
+        LEFT JOIN (
+            SELECT
+                faculty_id,
+                COUNT(DISTINCT CASE WHEN author_position = 'first' THEN doi END) AS first_author_docs,
+                COUNT(DISTINCT CASE WHEN author_position = 'corresponding' THEN doi END) AS corresponding_docs
+            FROM paper_faculty
+            GROUP BY faculty_id
+        ) pf ON pf.faculty_id = u.faculty_id
 
         WHERE u.faculty_id IS NOT NULL
         ${whereClause}
@@ -77,6 +88,8 @@ exports.getAllFaculty = (req, res) => {
             sdg: row.all_sdgs,
             domain: row.all_domains,
             docs_in_timeframe: row.filtered_docs,
+            first_author_docs: row.first_author_docs || 0,
+            corresponding_docs: row.corresponding_docs || 0,
             scopus_ids: row.scopus_ids ? row.scopus_ids.split('|').filter(Boolean) : []
         }));
 
@@ -191,7 +204,11 @@ exports.getCriteriaFilteredFaculty = (req, res) => {
 
 exports.getFacultyDetails = (req, res) => {
     const { facultyId } = req.params;
-    const { sdg, domain, year, quartileYear, start, end } = req.query;
+    const { sdg, domain, year, quartileYear, start, end, position } = req.query;
+
+    if (position && !['first', 'corresponding', 'author'].includes(position)) {
+        return res.status(400).json({ error: "Invalid position parameter" });
+    }
 
     // ✅ Fixed: Validate quartileYear input
     let safeQuartileYear = "2024"; // default
@@ -253,29 +270,41 @@ exports.getFacultyDetails = (req, res) => {
 
                     // ✅ Fixed: Papers table doesn't have quartile columns by year
                     // The quartile in papers table is just varchar(4) - current quartile
-                    // faculty_quartile_summary table has year-wise quartiles
+                    // paper_quartile has one (doi, sjr_year, quartile) row per SJR year
                     let baseQuery = `
                         SELECT
                             p.*,
                             pi.sustainable_development_goals AS sdg,
                             pi.qs_subject_field_name AS domain,
-                            fqs.quartile_2022,
-                            fqs.quartile_2023,
-                            fqs.quartile_2024,
-                            fqs.quartile_${safeQuartileYear} AS quartile_value
+                            pq.quartile AS quartile_value,
+                            (
+                                SELECT GROUP_CONCAT(CONCAT(aq.sjr_year, ':', aq.quartile) SEPARATOR '|')
+                                FROM paper_quartile aq
+                                WHERE aq.doi = p.doi
+                            ) AS quartile_list
 
                         FROM users u
                         JOIN papers p
                             ON u.scopus_id = p.scopus_id
                         LEFT JOIN paper_insights pi
                             ON p.doi = pi.doi
-                        LEFT JOIN faculty_quartile_summary fqs
-                            ON p.doi = fqs.doi
-                           AND p.scopus_id = fqs.scopus_id
+                        LEFT JOIN paper_quartile pq
+                            ON p.doi = pq.doi
+                           AND pq.sjr_year = ?
                     `;
+                    queryParams.unshift(parseInt(safeQuartileYear));
 
                     const conditions = [`u.faculty_id = ?`];
 
+                    // Author position filter (first / corresponding / author) via paper_faculty
+                    if (position) {
+                        conditions.push(`EXISTS (
+                            SELECT 1 FROM paper_faculty pf
+                            WHERE pf.doi = p.doi AND pf.faculty_id = u.faculty_id AND pf.author_position = ?
+                        )`);
+                        queryParams.push(position);
+                    }
+
                     // Date range filter
                     if (start && end) {
                         conditions.push("p.date BETWEEN ? AND ?");
@@ -285,10 +314,9 @@ exports.getFacultyDetails = (req, res) => {
                     // Apply SDG / domain / year filters only if date range not used
                     if (!start || !end) {
                         if (sdg) {
-                            conditions.push(
-                                "REPLACE(LOWER(pi.sustainable_development_goals), ' ', '') LIKE ?"
-                            );
-                            queryParams.push(`%${sdg.toLowerCase().replace(/\s+/g, "")}%`);
+                            const { clause, param } = sdgFilter(sdg);
+                            conditions.push(clause);
+                            queryParams.push(param);
                         }
 
                         if (domain) {
@@ -323,12 +351,12 @@ exports.getFacultyDetails = (req, res) => {
                             paper.quartile_year = safeQuartileYear;
 
                             paper.quartiles = {};
-                            Object.keys(paper).forEach(key => {
-                                const match = key.match(/^quartile_(\d{4})$/);
-                                if (match && paper[key]) {
-                                    paper.quartiles[match[1]] = paper[key];
-                                }
+                            (paper.quartile_list || '').split('|').filter(Boolean).forEach(entry => {
+                                const [sjrYear, quartile] = entry.split(':');
+                                paper.quartiles[sjrYear] = quartile;
+                                paper[`quartile_${sjrYear}`] = quartile;
                             });
+                            delete paper.quartile_list;
                         });
 
                         res.json({
@@ -365,11 +393,17 @@ exports.getFacultyQuartileSummary = (req, res) => {
 
             const scopusIds = scopusRows.map(r => r.scopus_id);
 
-            // 2️⃣ Fetch quartile data using scopus_ids
+            // 2️⃣ Year-wise quartile counts in one GROUP BY over paper_quartile
             const query = `
-                SELECT *
-                FROM faculty_quartile_summary
+                SELECT
+                    sjr_year,
+                    SUM(quartile = 'Q1') AS q1_count,
+                    SUM(quartile = 'Q2') AS q2_count,
+                    SUM(quartile = 'Q3') AS q3_count,
+                    SUM(quartile = 'Q4') AS q4_count
+                FROM paper_quartile
                 WHERE scopus_id IN (?)
+                GROUP BY sjr_year
             `;
 
             db.query(query, [scopusIds], (err2, rows) => {
@@ -378,33 +412,16 @@ exports.getFacultyQuartileSummary = (req, res) => {
                     return res.status(500).json({ error: "Failed to fetch quartile summary" });
                 }
 
-                // 3️⃣ Aggregate year-wise quartiles
+                // 3️⃣ Shape as { year: { q1_count, ... } }
                 const summaryByYear = {};
 
                 for (const row of rows) {
-                    for (const key of Object.keys(row)) {
-                        const match = key.match(/^quartile_(\d{4})$/);
-                        if (!match) continue;
-
-                        const year = match[1];
-                        const quartile = row[key];
-
-                        if (!summaryByYear[year]) {
-                            summaryByYear[year] = {
-                                q1_count: 0,
-                                q2_count: 0,
-                                q3_count: 0,
-                                q4_count: 0
-                            };
-                        }
-
-                        switch (quartile) {
-                            case "Q1": summaryByYear[year].q1_count++; break;
-                            case "Q2": summaryByYear[year].q2_count++; break;
-                            case "Q3": summaryByYear[year].q3_count++; break;
-                            case "Q4": summaryByYear[year].q4_count++; break;
-                        }
-                    }
+                    summaryByYear[row.sjr_year] = {
+                        q1_count: Number(row.q1_count) || 0,
+                        q2_count: Number(row.q2_count) || 0,
+                        q3_count: Number(row.q3_count) || 0,
+                        q4_count: Number(row.q4_count) || 0
+                    };
                 }
 
                 res.json(summaryByYear);
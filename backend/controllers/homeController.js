@@ -1,4 +1,5 @@
 const db = require('../config/db');
+const { sdgCountColumns, countsFromRow } = require('../utils/sdgMask');
 
 exports.getHomepageStats = async (req, res) => {
   try {
@@ -16,19 +17,13 @@ exports.getHomepageStats = async (req, res) => {
     `);
 
     /* ---------------- TOP 3 SDGs ---------------- */
-    const [sdgRaw] = await con.query(`
-      SELECT sustainable_development_goals
+    const [sdgRows] = await con.query(`
+      SELECT ${sdgCountColumns()}
       FROM paper_insights
-      WHERE sustainable_development_goals IS NOT NULL
+      WHERE sdg_mask <> 0
     `);
 
-    const sdgCount = {};
-    for (const row of sdgRaw) {
-      const sdgs = row.sustainable_development_goals.split('|').map(s => s.trim());
-      sdgs.forEach(sdg => {
-        if (sdg) sdgCount[sdg] = (sdgCount[sdg] || 0) + 1;
-        });
-    }
+    const sdgCount = countsFromRow(sdgRows[0]);
 
     const topSDGs = Object.entries(sdgCount)
       .sort((a, b) => b[1] - a[1])
@@ -36,32 +31,19 @@ exports.getHomepageStats = async (req, res) => {
       .map(([sdg, count]) => ({ sdg, count }));
 
     /* ---------------- TOP 3 COLLAB COUNTRIES (EXCLUDING INDIA) ---------------- */
-    const [countryRaw] = await con.query(`
-      SELECT country_list
-      FROM paper_insights
-      WHERE country_list IS NOT NULL
+    const [topCountries] = await con.query(`
+      SELECT country, paper_count AS count
+      FROM country_paper_count
+      WHERE LOWER(country) <> 'india'
+      ORDER BY paper_count DESC
+      LIMIT 3
     `);
 
-    const countryCount = {};
-    for (const row of countryRaw) {
-      const countries = row.country_list.split('|').map(c => c.trim());
-      countries.forEach(c => {
-        if (c && c.toLowerCase() !== 'india') {
-          countryCount[c] = (countryCount[c] || 0) + 1;
-        }
-      });
-    }
-
-    const topCountries = Object.entries(countryCount)
-      .sort((a, b) => b[1] - a[1])
-      .slice(0, 3)
-      .map(([country, count]) => ({ country, count }));
-
     /* ---------------- Q1 PAPERS (AS OF 2024 — UI MATCHED) ---------------- */
     const [q1Data] = await con.query(`
       SELECT COUNT(*) AS total
-      FROM faculty_quartile_summary
-      WHERE quartile_2024 = 'Q1'
+      FROM paper_quartile
+      WHERE sjr_year = 2024 AND quartile = 'Q1'
     `);
 
     /* ---------------- TOTAL PUBLICATIONS (LAST 1 YEAR) ---------------- */
@@ -72,12 +54,18 @@ exports.getHomepageStats = async (req, res) => {
     `);
 
     /* ---------------- TOP JOURNAL ---------------- */
+    // papers not linked to a journal yet (journal_backfill.py not run) count under their publication_name
     const [topJournalRow] = await con.query(`
-      SELECT publication_name, COUNT(*) AS count
-      FROM papers
-      GROUP BY publication_name
-      ORDER BY count DESC
-      LIMIT 1
+      SELECT COALESCE(j.name, t.publication_name) AS publication_name, t.count
+      FROM (
+        SELECT journal_id, IF(journal_id IS NULL, publication_name, NULL) AS publication_name, COUNT(*) AS count
+        FROM papers
+        WHERE journal_id IS NOT NULL OR publication_name <> ''
+        GROUP BY journal_id, IF(journal_id IS NULL, publication_name, NULL)
+        ORDER BY count DESC
+        LIMIT 1
+      ) t
+      LEFT JOIN journals j ON j.id = t.journal_id
     `);
 
     const topJournal = topJournalRow[0] || { publication_name: 'N/A', count: 0 };
@@ -1,5 +1,6 @@
 const db = require('../config/db.js');
 const { dataAccessLog } = require('../middleware/loggingMiddleware');
+const { sdgFilter } = require('../utils/sdgMask');
 
 /**
  * Global search across faculty and papers
@@ -120,8 +121,9 @@ exports.advancedSearch = (req, res) => {
     }
     
     if (sdg) {
-        query += ` AND pi.sustainable_development_goals LIKE ?`;
-        params.push(`%${sdg}%`);
+        const { clause, param } = sdgFilter(sdg);
+        query += ` AND ${clause}`;
+        params.push(param);
     }
     
     if (domain) {
@@ -80,53 +80,26 @@ exports.getTopAuthor = (req, res) => {
 exports.getQuartileStats = (req, res) => {
   const { year } = req.query;
 
-  const mapCase = (col) => `
-    CASE 
-      WHEN UPPER(TRIM(${col})) IN ('1','Q1') THEN 'Q1'
-      WHEN UPPER(TRIM(${col})) IN ('2','Q2') THEN 'Q2'
-      WHEN UPPER(TRIM(${col})) IN ('3','Q3') THEN 'Q3'
-      WHEN UPPER(TRIM(${col})) IN ('4','Q4') THEN 'Q4'
-      ELSE NULL
-    END
+  // paper_quartile holds one (doi, sjr_year, quartile) row per SJR year,
+  // so both cases are a single GROUP BY on the (sjr_year, quartile) index
+  let query = `
+    SELECT quartile, COUNT(*) AS count
+    FROM paper_quartile
+    GROUP BY quartile;
   `;
+  const params = [];
 
-  let query = '';
-
-  // 🔒 Explicitly supported years ONLY
-  if (year === '2022' || year === '2023' || year === '2024') {
-    const column = `quartile_${year}`;
+  if (year && /^\d{4}$/.test(year)) {
     query = `
-      SELECT ${mapCase(column)} AS quartile, COUNT(*) AS count
-      FROM faculty_quartile_summary
-      WHERE ${column} IS NOT NULL AND ${column} != ''
-      GROUP BY quartile;
-    `;
-  } else {
-    // Combined stats for all AVAILABLE years only
-    query = `
-      SELECT quartile, COUNT(*) AS count FROM (
-        SELECT ${mapCase('quartile_2022')} AS quartile
-        FROM faculty_quartile_summary
-        WHERE quartile_2022 IS NOT NULL AND quartile_2022 != ''
-
-        UNION ALL
-
-        SELECT ${mapCase('quartile_2023')}
-        FROM faculty_quartile_summary
-        WHERE quartile_2023 IS NOT NULL AND quartile_2023 != ''
-
-        UNION ALL
-
-        SELECT ${mapCase('quartile_2024')}
-        FROM faculty_quartile_summary
-        WHERE quartile_2024 IS NOT NULL AND quartile_2024 != ''
-      ) t
-      WHERE quartile IS NOT NULL
+      SELECT quartile, COUNT(*) AS count
+      FROM paper_quartile
+      WHERE sjr_year = ?
       GROUP BY quartile;
     `;
+    params.push(parseInt(year));
   }
 
-  db.query(query, (err, results) => {
+  db.query(query, params, (err, results) => {
     if (err) {
       console.error(err);
       return res.status(500).json({ error: 'Failed to fetch quartile stats' });
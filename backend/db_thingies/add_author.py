@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 import sys
+import os
 import json
 import mysql.connector
 from mysql.connector import Error
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python_files"))
+from faculty_attribution import refresh_faculty
+
 def connect_to_database():
     """Connect to database using same config as scopus_sync.py"""
     try:
@@ -86,6 +90,12 @@ def add_author_to_database(name, scopus_id, faculty_id, email, designation, mobi
         """
         cursor.execute(insert_query, (faculty_id, name, designation or None, mobile_no or None, email or None, doj or None, scopus_id, 2, 0))
         connection.commit()
+
+        # Attribute papers already on file for this Scopus ID (e.g. SciVal first/corresponding author)
+        try:
+            refresh_faculty(connection, [faculty_id])
+        except Error:
+            pass  # not fatal: the next Scopus sync rebuilds paper_faculty
         
         # Return success response
         result = {
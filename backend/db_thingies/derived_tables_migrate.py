@@ -0,0 +1,87 @@
+import os
+import sys
+
+import mysql.connector
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python_files"))
+from paper_countries import refresh_paper_countries
+from sdg_mask import refresh_sdg_masks
+from institutions import refresh_paper_institutions, add_alias
+from country_collaboration import build_collaboration_matrix
+from faculty_attribution import refresh_paper_faculty, refresh_faculty
+
+# ---------------- CONFIG ----------------
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "",
+    "port": 3307,
+    "database": "scopuss"
+}
+# --------------------------------------
+
+# Backfill for deployments that predate the derived tables: creates and fills
+# paper_faculty, paper_country / country_paper_count, paper_insights.sdg_mask,
+# the institution tables and country_collaboration from what is already in the DB.
+# Afterwards the SciVal ingest and the Scopus syncs keep them current.
+#
+#   python derived_tables_migrate.py                                   every table
+#   python derived_tables_migrate.py faculty|countries|sdg_mask|institutions|collaboration ...
+#   python derived_tables_migrate.py faculty <faculty_id> ...          re-attribute just these faculty
+#   python derived_tables_migrate.py alias "<alias name>" "<canonical name>"
+#                                                                      map an institution name onto another
+
+INSIGHT_STEPS = {
+    "countries": (refresh_paper_countries, "paper_country / country_paper_count"),
+    "sdg_mask": (refresh_sdg_masks, "paper_insights.sdg_mask"),
+    "institutions": (refresh_paper_institutions, "institutions / paper_institution"),
+    "collaboration": (build_collaboration_matrix, "country_collaboration"),
+}
+STEPS = ["faculty", *INSIGHT_STEPS]
+
+
+def main(args):
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        if args[:1] == ["alias"] and len(args) == 3:
+            add_alias(conn, args[1], args[2])
+            print(f"✔ '{args[1]}' mapped onto '{args[2]}'")
+            return
+        if args[:1] == ["faculty"] and len(args) > 1 and args[1] not in STEPS:
+            refresh_faculty(conn, args[1:])
+            print(f"✔ paper_faculty refreshed for {', '.join(args[1:])}")
+            return
+        steps = args or STEPS
+        unknown = [s for s in steps if s not in STEPS]
+        if unknown:
+            print(f"Unknown step(s) {', '.join(unknown)}; choose from {', '.join(STEPS)}")
+            sys.exit(1)
+
+        cursor = conn.cursor()
+        cursor.execute("SHOW TABLES LIKE 'paper_insights'")
+        has_insights = cursor.fetchone() is not None
+        cursor.close()
+
+        if "faculty" in steps:
+            refresh_paper_faculty(conn)
+            print("✔ paper_faculty backfilled")
+
+        insight_steps = [s for s in steps if s in INSIGHT_STEPS]
+        if insight_steps and not has_insights:
+            print("ℹ No paper_insights table yet; the SciVal-derived tables are filled by the first upload")
+            return
+        for step in insight_steps:
+            refresh, label = INSIGHT_STEPS[step]
+            refresh(conn)
+            print(f"✔ {label} backfilled")
+    except mysql.connector.Error as e:
+        print(f"❌ Derived table backfill failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    print("🎉 Derived tables ready")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,88 @@
+import os
+import sys
+
+import mysql.connector
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python_files"))
+from journals import ensure_journal_tables, JournalResolver, journal_sjr_frame
+from quartile_writer import bulk_upsert_journal_sjr
+from sjr_index import INDEX_DIR, SjrIndex
+
+# ---------------- CONFIG ----------------
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "",
+    "port": 3307,
+    "database": "scopuss"
+}
+# --------------------------------------
+
+# One-time backfill for papers synced before journals existed: builds journals from
+# papers.publication_name / issn / eissn, sets papers.journal_id, and fills journal_sjr
+# from the compiled SJR index when one is available.
+
+
+def main():
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+
+    ensure_journal_tables(cursor)
+    conn.commit()
+
+    cursor.execute("""
+        SELECT DISTINCT publication_name, issn, eissn
+        FROM papers
+        WHERE journal_id IS NULL
+    """)
+    venues = cursor.fetchall()
+    print(f"✔ {len(venues)} distinct venues without a journal_id")
+
+    journals = JournalResolver(conn)
+    rows = []
+    for name, issn, eissn in venues:
+        journal_id = journals.resolve(name, issn, eissn)
+        if journal_id is not None:
+            rows.append((journal_id, name, issn, eissn))
+    conn.commit()
+
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_paper_journal")
+    cursor.execute("""
+        CREATE TEMPORARY TABLE tmp_paper_journal (
+            journal_id INT,
+            publication_name VARCHAR(255),
+            issn CHAR(8),
+            eissn CHAR(8)
+        )
+    """)
+    cursor.executemany(
+        "INSERT INTO tmp_paper_journal (journal_id, publication_name, issn, eissn) VALUES (%s, %s, %s, %s)",
+        rows
+    )
+    cursor.execute("""
+        UPDATE papers p
+        JOIN tmp_paper_journal t
+          ON p.publication_name <=> t.publication_name
+         AND p.issn <=> t.issn
+         AND p.eissn <=> t.eissn
+        SET p.journal_id = t.journal_id
+        WHERE p.journal_id IS NULL
+    """)
+    print(f"✔ Linked {cursor.rowcount} papers to {journals.created} new journals")
+    conn.commit()
+    journals.close()
+
+    if os.path.exists(os.path.join(INDEX_DIR, "years.npy")):
+        bulk_upsert_journal_sjr(conn, journal_sjr_frame(cursor, SjrIndex.load()))
+        print("✔ journal_sjr refreshed from the SJR index")
+    else:
+        print(f"No SJR index in {INDEX_DIR}/, journal_sjr left for the quartile jobs")
+
+    cursor.close()
+    conn.close()
+
+    print("DONE")
+
+
+if __name__ == "__main__":
+    main()
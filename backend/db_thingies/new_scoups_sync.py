@@ -1,12 +1,23 @@
 import sys
 import io
 import mysql.connector
-from elsapy.elsclient import ElsClient
-from elsapy.elsprofile import ElsAuthor
+import requests
 import json
 import os
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python_files"))
+from els_client import DeadlineElsClient
+from request_layer import DeadlineSession
+from issn_lookup import ensure_issn_columns
+from journals import ensure_journal_tables, JournalResolver
+from author_aliases import (
+    ensure_alias_table, load_aliases, record_aliases,
+    fetch_docs_resolving_aliases, consolidation_report
+)
+from sync_pipeline import SyncPipeline, FETCH_WORKERS
+from faculty_attribution import refresh_paper_faculty
+
 # ---------------- UTF-8 fix ----------------
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 # ------------------------------------------
@@ -49,7 +60,8 @@ def connect_to_database():
 
 
 def initialize_elsclient(config):
-    return ElsClient(config["apikey"])
+    http = DeadlineSession(hedge=config.get("hedge_requests", False))
+    return DeadlineElsClient(config["apikey"], http=http)
 
 # ---------- HELPERS ----------
 
@@ -88,23 +100,44 @@ def get_faculty_scopus_map(cursor):
 
 # ---------- INSERT PAPER ----------
 
-def insert_paper(cursor, scopus_id, doi, title, pub_type, pub_name, date, authors, affiliations):
-    authors += [""] * (6 - len(authors))
-    affiliations += [""] * (3 - len(affiliations))
+INSERT_PAPER_SQL = """
+    INSERT IGNORE INTO papers (
+        scopus_id, doi, title, type, publication_name, date, issn, eissn,
+        author1, author2, author3, author4, author5, author6,
+        affiliation1, affiliation2, affiliation3, journal_id
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s,
+            %s, %s, %s, %s, %s, %s,
+            %s, %s, %s, %s)
+"""
 
-    cursor.execute("""
-        INSERT IGNORE INTO papers (
-            scopus_id, doi, title, type, publication_name, date,
-            author1, author2, author3, author4, author5, author6,
-            affiliation1, affiliation2, affiliation3
-        )
-        VALUES (%s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s, %s,
-                %s, %s, %s)
-    """, (
-        scopus_id, doi, title, pub_type, pub_name, date,
-        *authors[:6], *affiliations[:3]
-    ))
+
+def paper_row(scopus_id, doc):
+    """Turn one ScopusDoc into an INSERT_PAPER_SQL row, or None if it has no DOI."""
+    if not doc.doi:
+        return None
+
+    authors = list(doc.authors[:6]) + [""] * (6 - len(doc.authors[:6]))
+    affiliations = list(doc.affiliations[:3]) + [""] * (3 - len(doc.affiliations[:3]))
+
+    return (
+        scopus_id,
+        doc.doi,
+        doc.title or "Unknown Title",
+        doc.aggregation_type or "Journal",
+        doc.publication_name or "Unknown",
+        doc.cover_date,
+        doc.issn,
+        doc.eissn,
+        *authors, *affiliations
+    )
+
+
+def insert_papers(cursor, rows, journals):
+    """Insert paper_row rows, linking each to its journals row (created on first sight)."""
+    cursor.executemany(INSERT_PAPER_SQL, [
+        row + (journals.resolve(row[4], row[6], row[7]),) for row in rows
+    ])
 
 # ---------- MONTHLY AUTHOR REPORT ----------
 
@@ -223,60 +256,105 @@ def fetch_new_papers():
     faculty_map = get_faculty_scopus_map(cursor)
     existing_papers = get_existing_papers(cursor)
 
-    total_faculty = len(faculty_map)
-    total_new_papers = 0
-
-    for idx, (faculty_id, scopus_ids) in enumerate(faculty_map.items(), start=1):
-        progress = idx / total_faculty
-        log_progress(f"Faculty {faculty_id} ({idx}/{total_faculty})", progress)
-
-        for scopus_id in scopus_ids:
-            author = ElsAuthor(
-                uri=f"https://api.elsevier.com/content/author/author_id/{scopus_id}"
-            )
-
-            if not author.read_docs(client):
+    ensure_issn_columns(cursor)
+    ensure_journal_tables(cursor)
+    ensure_alias_table(cursor)
+    aliases = load_aliases(cursor)
+    new_aliases = []
+
+    jobs = [
+        (faculty_id, scopus_id)
+        for faculty_id, scopus_ids in faculty_map.items()
+        for scopus_id in scopus_ids
+    ]
+
+    # fetch stage: network only, runs on several worker threads
+    def fetch_docs(job):
+        _, scopus_id = job
+        try:
+            return fetch_docs_resolving_aliases(client, scopus_id, aliases)
+        except requests.RequestException as e:
+            log_progress(f"Failed to fetch documents for {scopus_id}: {e}")
+            return None
+
+    # transform stage: single thread, so existing_papers needs no locking.
+    # Papers stay under the stored scopus_id even when fetched via its canonical ID.
+    def transform_docs(job, data):
+        _, scopus_id = job
+        docs, alias = data
+        if alias:
+            new_aliases.append(alias)
+            log_progress(f"Scopus ID {alias[0]} was merged into {alias[1]}")
+        for doc in docs:
+            row = paper_row(scopus_id, doc)
+            if row is None:
                 continue
-
-            for doc in author.doc_list:
-                doi = doc.get("prism:doi")
-                if not doi:
-                    continue
-
-                key = (scopus_id, doi)
-                if key in existing_papers:
-                    continue
-
-                title = doc.get("dc:title", "Unknown Title")
-                pub_type = doc.get("prism:aggregationType", "Journal")
-                pub_name = doc.get("prism:publicationName", "Unknown")
-                date = doc.get("prism:coverDate")
-
-                authors = [a.get("authname", "") for a in doc.get("author", [])[:6]]
-                affiliations = [a.get("affilname", "") for a in doc.get("affiliation", [])[:3]]
-
-                insert_paper(
-                    cursor,
-                    scopus_id,
-                    doi,
-                    title,
-                    pub_type,
-                    pub_name,
-                    date,
-                    authors,
-                    affiliations
-                )
-
-                existing_papers.add(key)
-                total_new_papers += 1
-
-        conn.commit()
+            key = (scopus_id, row[1])
+            if key in existing_papers:
+                continue
+            existing_papers.add(key)
+            yield row
+
+    # write stage: single thread with its own connection
+    write_conn = connect_to_database()
+    write_cursor = write_conn.cursor()
+    journals = JournalResolver(write_conn)
+
+    def write_rows(rows):
+        insert_papers(write_cursor, rows, journals)
+        write_conn.commit()
+
+    pipeline = SyncPipeline(
+        fetch_docs,
+        transform_docs,
+        write_rows,
+        progress_fn=lambda done, total: log_progress(
+            f"Scopus IDs fetched ({done}/{total})", 0.95 * done / total
+        ),
+        report_fn=lambda stats: log_progress("Sync pipeline stats", None, stats),
+        fetch_workers=config.get("fetch_workers", FETCH_WORKERS)
+    )
+    try:
+        try:
+            pipeline_stats = pipeline.run(jobs)
+        finally:
+            # a failed write stops the pipeline; still keep the journal counts and merged IDs seen so far
+            journals.close()
+            write_cursor.close()
+            write_conn.close()
+            record_aliases(cursor, conn, new_aliases)
+    except Exception as e:
+        log_progress(f"Sync stopped: {e}")
+        client.http.close()
+        cursor.close()
+        conn.close()
+        raise
+    total_new_papers = pipeline_stats["stages"]["write"]["items"]
+
+    to_consolidate = consolidation_report(cursor)
+    if to_consolidate:
+        log_progress(
+            f"{len(to_consolidate)} stored Scopus IDs point to merged profiles",
+            0.95,
+            {"consolidate": to_consolidate}
+        )
 
     log_progress(
         "Scopus fetch completed",
         0.95,
-        {"total_new_papers": total_new_papers}
+        {
+            "total_new_papers": total_new_papers,
+            "pipeline": pipeline_stats,
+            "http": client.http.stats()
+        }
     )
+    client.http.close()
+
+    # new papers (and any newly mapped IDs) get their faculty attribution now, not at the next SciVal upload
+    try:
+        refresh_paper_faculty(conn)
+    except mysql.connector.Error as e:
+        log_progress(f"Faculty attribution refresh failed: {e}")
 
     # ---------- MONTHLY REPORT ----------
     generate_monthly_author_report(cursor, conn)
@@ -0,0 +1,57 @@
+import os
+import re
+import sys
+
+import mysql.connector
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python_files"))
+from quartile_writer import QUARTILE_TABLE, create_quartile_table
+
+# ---------------- CONFIG ----------------
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "",
+    "port": 3307,
+    "database": "scopuss"
+}
+
+WIDE_TABLE = "faculty_quartile_summary"
+# --------------------------------------
+
+# One-time unpivot of faculty_quartile_summary (one quartile_<year> column per SJR year)
+# into the long paper_quartile table. The wide table is left in place.
+
+
+def main():
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+
+    create_quartile_table(cursor)
+    conn.commit()
+    print(f"✔ Table `{QUARTILE_TABLE}` ready")
+
+    cursor.execute(f"SHOW COLUMNS FROM {WIDE_TABLE} LIKE 'quartile\\_%'")
+    years = sorted(int(m.group(1)) for (col, *_) in cursor.fetchall()
+                   if (m := re.fullmatch(r"quartile_(\d{4})", col)))
+
+    for year in years:
+        col = f"quartile_{year}"
+        # older uploads stored bare 1..4 as well as Q1..Q4
+        cursor.execute(f"""
+            INSERT IGNORE INTO {QUARTILE_TABLE} (doi, sjr_year, scopus_id, quartile)
+            SELECT doi, %s, scopus_id, CONCAT('Q', RIGHT(UPPER(TRIM({col})), 1))
+            FROM {WIDE_TABLE}
+            WHERE UPPER(TRIM({col})) IN ('1', '2', '3', '4', 'Q1', 'Q2', 'Q3', 'Q4')
+        """, (year,))
+        conn.commit()
+        print(f"✔ {col}: copied {cursor.rowcount} rows")
+
+    cursor.close()
+    conn.close()
+
+    print("DONE")
+
+
+if __name__ == "__main__":
+    main()
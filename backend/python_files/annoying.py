@@ -8,25 +8,18 @@ db_config = {
     'database': 'scopus'
 }
 
-# Table/column config
-table_name = 'paper_insights'
-column_name = 'country_list'  # Column with country names separated by '|'
+# Countries come from the exploded paper_country table kept in sync by the SciVal ingest
+# (python db_thingies/derived_tables_migrate.py countries rebuilds it from paper_insights.country_list).
+table_name = 'country_paper_count'
 
 # Connect to DB
 conn = mysql.connector.connect(**db_config)
 cursor = conn.cursor()
 
-# Fetch country strings
-query = f"SELECT {column_name} FROM {table_name} WHERE {column_name} IS NOT NULL"
+# Fetch countries
+query = f"SELECT country FROM {table_name}"
 cursor.execute(query)
-rows = cursor.fetchall()
-
-unique_countries = set()
-
-for row in rows:
-    country_str = row[0]
-    countries = [c.strip() for c in country_str.split('|')]
-    unique_countries.update(countries)
+unique_countries = {row[0] for row in cursor.fetchall()}
 
 # Print sorted unique countries
 print("Unique Countries:\n")
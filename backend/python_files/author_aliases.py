@@ -0,0 +1,121 @@
+import requests
+
+from scopus_docs import fetch_author_docs
+
+AUTHOR_URL = "https://api.elsevier.com/content/author/author_id/"
+
+# ——— CACHE TABLE ———
+CREATE_ALIAS_TABLE = """
+CREATE TABLE IF NOT EXISTS scopus_author_alias (
+    old_scopus_id VARCHAR(50) PRIMARY KEY,
+    canonical_scopus_id VARCHAR(50) NOT NULL,
+    detected_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_seen DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_canonical (canonical_scopus_id)
+)
+"""
+
+
+def ensure_alias_table(cursor):
+    cursor.execute(CREATE_ALIAS_TABLE)
+
+
+def load_aliases(cursor):
+    """Return {old_scopus_id: canonical_scopus_id} from the cache table."""
+    cursor.execute("SELECT old_scopus_id, canonical_scopus_id FROM scopus_author_alias")
+    return {str(old): str(new) for old, new in cursor.fetchall()}
+
+
+def resolve(scopus_id, aliases):
+    """Follow alias chains (A → B → C) to the current canonical ID."""
+    current = str(scopus_id)
+    seen = {current}
+    while current in aliases and aliases[current] not in seen:
+        current = aliases[current]
+        seen.add(current)
+    return current
+
+
+def record_aliases(cursor, conn, pairs):
+    """Store (old_id, canonical_id) pairs; re-detection only bumps last_seen."""
+    if not pairs:
+        return
+    cursor.executemany("""
+        INSERT INTO scopus_author_alias (old_scopus_id, canonical_scopus_id)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE canonical_scopus_id = VALUES(canonical_scopus_id),
+                                last_seen = CURRENT_TIMESTAMP
+    """, [(str(old), str(new)) for old, new in pairs])
+    conn.commit()
+
+
+# ——— DETECTION ———
+def _id_from_url(url):
+    return url.rstrip("/").rsplit("/", 1)[-1] if url else None
+
+
+def detect_canonical_id(client, scopus_id):
+    """
+    Ask the author retrieval API who scopus_id is now. Returns the canonical ID when the
+    profile was merged (alias payload or a redirect to another profile), otherwise None.
+    """
+    scopus_id = str(scopus_id)
+    try:
+        data = client.exec_request(AUTHOR_URL + scopus_id + "?field=dc:identifier")
+    except requests.RequestException:
+        return None
+
+    response = data.get("author-retrieval-response", {})
+    if isinstance(response, list):
+        response = response[0] if response else {}
+
+    alias = response.get("alias")
+    if alias:
+        urls = alias.get("prism:url", [])
+        if isinstance(urls, dict):
+            urls = [urls]
+        for entry in urls:
+            canonical = _id_from_url(entry.get("$"))
+            if canonical and canonical != scopus_id:
+                return canonical
+
+    identifier = response.get("coredata", {}).get("dc:identifier", "")
+    canonical = identifier.split(":")[-1] if identifier else None
+    if canonical and canonical != scopus_id:
+        return canonical
+    return None
+
+
+def fetch_docs_resolving_aliases(client, scopus_id, aliases):
+    """
+    Fetch documents for scopus_id, going straight to its canonical ID when the cache
+    knows one. An empty result triggers an alias check; returns (docs, new_alias_pair).
+    """
+    fetch_id = resolve(scopus_id, aliases)
+    docs = fetch_author_docs(client, fetch_id)
+    if docs:
+        return docs, None
+
+    canonical = detect_canonical_id(client, fetch_id)
+    if not canonical:
+        return docs, None
+    return fetch_author_docs(client, canonical), (fetch_id, canonical)
+
+
+# ——— REPORT ———
+def consolidation_report(cursor):
+    """IDs still stored in users / faculty_scopus_map that resolve to another profile."""
+    cursor.execute("""
+        SELECT 'users' AS source, u.faculty_id, u.scopus_id, a.canonical_scopus_id
+        FROM users u
+        JOIN scopus_author_alias a ON a.old_scopus_id = u.scopus_id
+        UNION ALL
+        SELECT 'faculty_scopus_map' AS source, f.faculty_id, f.scopus_id, a.canonical_scopus_id
+        FROM faculty_scopus_map f
+        JOIN scopus_author_alias a ON a.old_scopus_id = f.scopus_id
+    """)
+    return [
+        {"source": source, "faculty_id": faculty_id,
+         "old_scopus_id": str(old), "canonical_scopus_id": str(new)}
+        for source, faculty_id, old, new in cursor.fetchall()
+    ]
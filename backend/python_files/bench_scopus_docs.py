@@ -0,0 +1,80 @@
+import json
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from els_client import DeadlineElsClient
+from scopus_docs import SEARCH_URL, PAGE_SIZE, search_url, decode_page
+
+# Compares the full Scopus search payload (what the sync used to pull through
+# elsapy) with the field-projected payload decoded into ScopusDoc records.
+#
+# Usage: python bench_scopus_docs.py <scopus_author_id> [repeats]
+
+REPEATS = 50
+
+
+def full_url(scopus_id):
+    return SEARCH_URL + "?" + urlencode({
+        "query": f"AU-ID({scopus_id})",
+        "view": "COMPLETE",
+        "start": 0,
+        "count": PAGE_SIZE,
+    })
+
+
+def decode_full(body):
+    return json.loads(body).get("search-results", {}).get("entry", [])
+
+
+def time_decode(fn, body, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(body)
+    return (time.perf_counter() - start) / repeats
+
+
+def memory_per_doc(fn, body):
+    tracemalloc.start()
+    result = fn(body)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    docs = result[1] if isinstance(result, tuple) else result
+    return size / max(len(docs), 1), len(docs)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python bench_scopus_docs.py <scopus_author_id> [repeats]")
+        sys.exit(1)
+    scopus_id = sys.argv[1]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else REPEATS
+
+    with open("./config.json") as f:
+        config = json.load(f)
+    client = DeadlineElsClient(config["apikey"])
+
+    full_body = client.exec_request_bytes(full_url(scopus_id))
+    projected_body = client.exec_request_bytes(search_url(scopus_id))
+
+    full_time = time_decode(decode_full, full_body, repeats)
+    projected_time = time_decode(decode_page, projected_body, repeats)
+    full_mem, n_full = memory_per_doc(decode_full, full_body)
+    projected_mem, n_projected = memory_per_doc(decode_page, projected_body)
+
+    print(f"Author {scopus_id}: {n_full} docs (full) / {n_projected} docs (projected), first page")
+    print(f"{'':<22}{'full':>14}{'projected':>14}{'ratio':>10}")
+    for label, a, b, fmt in (
+        ("payload bytes", len(full_body), len(projected_body), "{:>14,.0f}"),
+        ("decode ms / page", full_time * 1000, projected_time * 1000, "{:>14.3f}"),
+        ("memory bytes / doc", full_mem, projected_mem, "{:>14,.0f}"),
+    ):
+        ratio = a / b if b else float("nan")
+        print(f"{label:<22}" + fmt.format(a) + fmt.format(b) + f"{ratio:>9.1f}x")
+
+    client.http.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from paper_countries import ensure_country_tables
+from quartile_writer import swap_in_shadow
+from sdg_mask import SDG_COUNT, ensure_sdg_mask_column
+
+# ——— SCHEMA ———
+# country_collaboration: the country × country co-authorship matrix, stored sparse (only
+# non-zero cells, country_a <= country_b). The diagonal holds each country's own paper
+# count in the slice. pub_year = 0 means all years, sdg = 0 means all SDGs.
+COLLAB_TABLE = "country_collaboration"
+BATCH = 5000
+
+
+def create_collaboration_table(cursor, table):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            pub_year SMALLINT NOT NULL,
+            sdg TINYINT NOT NULL,
+            country_a VARCHAR(100) NOT NULL,
+            country_b VARCHAR(100) NOT NULL,
+            paper_count INT NOT NULL,
+            PRIMARY KEY (pub_year, sdg, country_a, country_b)
+        )
+    """)
+
+
+def load_paper_countries(cursor):
+    """One row per (doi, country) with the paper's publication year (0 if unknown) and SDG mask."""
+    cursor.execute("""
+        SELECT pc.doi, pc.country, COALESCE(y.pub_year, 0), COALESCE(pi.sdg_mask, 0)
+        FROM paper_country pc
+        LEFT JOIN paper_insights pi ON pi.doi = pc.doi
+        LEFT JOIN (SELECT doi, MIN(YEAR(date)) AS pub_year FROM papers GROUP BY doi) y ON y.doi = pc.doi
+    """)
+    return pd.DataFrame(cursor.fetchall(), columns=["doi", "country", "pub_year", "sdg_mask"])
+
+
+# ——— MATRIX ———
+def country_pairs(df):
+    """
+    Sparse incidence (paper, country) → every co-occurring pair (a <= b) per paper, with the
+    paper's year and SDG mask. A self-join on the paper code, i.e. the non-zero cells of BᵀB.
+    """
+    country_code, countries = pd.factorize(df["country"], sort=True)
+    paper_code, _ = pd.factorize(df["doi"])
+    incidence = pd.DataFrame({"paper": paper_code, "a": country_code})
+    pairs = incidence.merge(incidence.rename(columns={"a": "b"}), on="paper")
+    pairs = pairs[pairs["a"] <= pairs["b"]]
+
+    per_paper = df.groupby(paper_code).agg(pub_year=("pub_year", "first"), sdg_mask=("sdg_mask", "first"))
+    paper = pairs["paper"].to_numpy()
+    pairs = pairs.assign(pub_year=per_paper["pub_year"].to_numpy(dtype=np.int64)[paper],
+                         sdg_mask=per_paper["sdg_mask"].to_numpy(dtype=np.int64)[paper])
+    return pairs, countries
+
+
+def collaboration_counts(pairs, countries):
+    """Paper counts per (pub_year, sdg, country_a, country_b), including the all-years/all-SDG slices."""
+    frames = []
+    for sdg in range(SDG_COUNT + 1):
+        sel = pairs if sdg == 0 else pairs[(pairs["sdg_mask"].to_numpy() >> (sdg - 1)) & 1 == 1]
+        if sel.empty:
+            continue
+        by_year = sel[sel["pub_year"] > 0].groupby(["pub_year", "a", "b"]).size().reset_index(name="paper_count")
+        all_years = sel.groupby(["a", "b"]).size().reset_index(name="paper_count").assign(pub_year=0)
+        frames += [by_year.assign(sdg=sdg), all_years.assign(sdg=sdg)]
+    if not frames:
+        return pd.DataFrame(columns=["pub_year", "sdg", "country_a", "country_b", "paper_count"])
+    out = pd.concat(frames, ignore_index=True)
+    names = np.asarray(countries, dtype=object)
+    return pd.DataFrame({
+        "pub_year": out["pub_year"], "sdg": out["sdg"],
+        "country_a": names[out["a"].to_numpy()], "country_b": names[out["b"].to_numpy()],
+        "paper_count": out["paper_count"],
+    })
+
+
+def build_collaboration_matrix(cnx, table=COLLAB_TABLE):
+    """Rebuild the whole matrix into {table}_shadow and swap it in."""
+    cursor = cnx.cursor()
+    ensure_country_tables(cursor)
+    ensure_sdg_mask_column(cursor)
+    df = load_paper_countries(cursor)
+    pairs, countries = country_pairs(df)
+    counts = collaboration_counts(pairs, countries)
+
+    shadow = f"{table}_shadow"
+    cursor.execute(f"DROP TABLE IF EXISTS {shadow};")
+    create_collaboration_table(cursor, shadow)
+    rows = list(zip(counts["pub_year"].tolist(), counts["sdg"].tolist(), counts["country_a"].tolist(),
+                    counts["country_b"].tolist(), counts["paper_count"].tolist()))
+    for i in range(0, len(rows), BATCH):
+        cursor.executemany(f"""
+            INSERT INTO {shadow} (pub_year, sdg, country_a, country_b, paper_count)
+            VALUES (%s, %s, %s, %s, %s)
+        """, rows[i:i + BATCH])
+    cnx.commit()
+    cursor.close()
+    swap_in_shadow(cnx, table)
+    logging.info(f"🤝 {table}: {len(rows)} cells over {len(countries)} countries "
+                 f"from {df['doi'].nunique()} papers")
+    return len(rows)
@@ -0,0 +1,52 @@
+import json
+import threading
+import time
+
+import requests
+from elsapy.elsclient import ElsClient
+
+from request_layer import DeadlineSession
+
+
+class DeadlineElsClient(ElsClient):
+    """
+    ElsClient whose requests go through a DeadlineSession, so ElsAuthor.read()
+    and ElsAuthor.read_docs() get latency-based deadlines (and optional hedging)
+    instead of waiting on the socket indefinitely. Hedged duplicates go through
+    the same 1 req/s throttle as every other call.
+    """
+
+    MIN_REQ_INTERVAL = 1  # seconds, same throttle elsapy applies
+
+    def __init__(self, api_key, inst_token=None, num_res=25, http=None):
+        super().__init__(api_key, inst_token=inst_token, num_res=num_res)
+        self.http = http or DeadlineSession()
+        self._throttle_lock = threading.Lock()
+        self._ts_last_req = 0.0
+
+    def _throttle(self):
+        with self._throttle_lock:
+            interval = time.time() - self._ts_last_req
+            if interval < self.MIN_REQ_INTERVAL:
+                time.sleep(self.MIN_REQ_INTERVAL - interval)
+            self._ts_last_req = time.time()
+
+    def exec_request_bytes(self, URL):
+        """Sends the request through the deadline layer; returns the raw response body."""
+        headers = {
+            "X-ELS-APIKey": self.api_key,
+            "Accept": "application/json",
+        }
+        if self.inst_token:
+            headers["X-ELS-Insttoken"] = self.inst_token
+        r = self.http.get(URL, key="elsevier", throttle=self._throttle, headers=headers)
+        self._status_code = r.status_code
+        if r.status_code == 200:
+            self._status_msg = "data retrieved"
+            return r.content
+        self._status_msg = f"HTTP {r.status_code} Error from {URL}: {r.text}"
+        raise requests.HTTPError(self._status_msg)
+
+    def exec_request(self, URL):
+        """Sends the request through the deadline layer; returns the decoded JSON."""
+        return json.loads(self.exec_request_bytes(URL))
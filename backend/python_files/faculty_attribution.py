@@ -0,0 +1,145 @@
+import logging
+from itertools import islice
+
+import pandas as pd
+
+# ——— SCHEMA ———
+# paper_faculty: which faculty member is on which paper, and in what position, from the
+# SciVal author ID columns of paper_insights:
+#   author                 scopus_author_ids, every author of the paper (co-authors included)
+#   first / corresponding  scopus_author_id_first / _corresponding
+# A paper can hold several rows for one faculty member (e.g. author and first).
+CREATE_PAPER_FACULTY_TABLE = """
+CREATE TABLE IF NOT EXISTS paper_faculty (
+    doi VARCHAR(255) NOT NULL,
+    faculty_id VARCHAR(50) NOT NULL,
+    author_position ENUM('first', 'corresponding', 'author') NOT NULL,
+    PRIMARY KEY (doi, faculty_id, author_position),
+    KEY idx_paper_faculty_faculty (faculty_id, author_position)
+)
+"""
+
+INSIGHT_AUTHOR_COLUMNS = {
+    "scopus_author_ids": "author",
+    "scopus_author_id_first": "first",
+    "scopus_author_id_corresponding": "corresponding",
+}
+BATCH = 5000
+
+
+def ensure_paper_faculty_table(cursor):
+    cursor.execute(CREATE_PAPER_FACULTY_TABLE)
+
+
+def _table_exists(cursor, table):
+    """paper_insights / faculty_scopus_map only exist once SciVal / new_data.py have run."""
+    cursor.execute("SHOW TABLES LIKE %s", (table,))
+    return cursor.fetchone() is not None
+
+
+def _author_columns(cursor):
+    """The INSIGHT_AUTHOR_COLUMNS paper_insights has (scopus_author_ids arrives with the next SciVal upload)."""
+    if not _table_exists(cursor, "paper_insights"):
+        return []
+    cursor.execute("SHOW COLUMNS FROM paper_insights")
+    present = {row[0] for row in cursor.fetchall()}
+    return [c for c in INSIGHT_AUTHOR_COLUMNS if c in present]
+
+
+def clean_ids(ids):
+    """Vectorized clean_scopus_id: strings, stripped, without the '.0' of float round-trips."""
+    return ids.astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+
+
+def faculty_id_map(cursor):
+    """DataFrame (scopus_id, faculty_id) over users' main IDs and faculty_scopus_map's extra ones."""
+    extra = """
+        UNION
+        SELECT scopus_id, faculty_id FROM faculty_scopus_map WHERE faculty_id IS NOT NULL
+    """ if _table_exists(cursor, "faculty_scopus_map") else ""
+    cursor.execute(f"SELECT scopus_id, faculty_id FROM users WHERE faculty_id IS NOT NULL {extra}")
+    ids = pd.DataFrame(cursor.fetchall(), columns=["scopus_id", "faculty_id"], dtype=object)
+    ids["scopus_id"] = clean_ids(ids["scopus_id"])
+    ids["faculty_id"] = ids["faculty_id"].astype(str).str.strip()
+    return ids[(ids["scopus_id"] != "") & (ids["faculty_id"] != "")].drop_duplicates()
+
+
+def explode_author_ids(df, column, position):
+    """(doi, scopus_id, author_position) with one row per ID in a '|' separated column."""
+    ids = df[["doi", column]].dropna()
+    ids = ids.assign(scopus_id=ids[column].astype(str).str.split("|")).explode("scopus_id")
+    ids["scopus_id"] = clean_ids(ids["scopus_id"])
+    return ids.loc[ids["scopus_id"] != "", ["doi", "scopus_id"]].assign(author_position=position)
+
+
+def attribution_rows(insights, id_map):
+    """Every author ID column exploded and joined to faculty → distinct (doi, faculty_id, author_position)."""
+    frames = [explode_author_ids(insights, col, pos) for col, pos in INSIGHT_AUTHOR_COLUMNS.items()
+              if col in insights.columns]
+    if not frames:
+        return pd.DataFrame(columns=["doi", "faculty_id", "author_position"], dtype=object)
+    authors = pd.concat(frames, ignore_index=True)
+    linked = authors.merge(id_map, on="scopus_id", how="inner")
+    return linked[["doi", "faculty_id", "author_position"]].drop_duplicates()
+
+
+def refresh_paper_faculty(cnx, doi_subquery=None):
+    """Rebuild paper_faculty for the DOIs returned by doi_subquery (every paper when None)."""
+    cursor = cnx.cursor()
+    ensure_paper_faculty_table(cursor)
+    columns = _author_columns(cursor)
+    insights = pd.DataFrame(columns=["doi", *columns], dtype=object)
+    if columns:
+        scope = f"WHERE pi.doi IN ({doi_subquery})" if doi_subquery else ""
+        cursor.execute(f"SELECT pi.doi, {', '.join('pi.' + c for c in columns)} FROM paper_insights pi {scope}")
+        insights = pd.DataFrame(cursor.fetchall(), columns=insights.columns, dtype=object)
+
+    rows = attribution_rows(insights, faculty_id_map(cursor))
+
+    cursor.execute(f"DELETE FROM paper_faculty WHERE doi IN ({doi_subquery})" if doi_subquery
+                   else "DELETE FROM paper_faculty")
+    _insert(cursor, rows)
+    cnx.commit()
+    cursor.close()
+    logging.info(f"👩‍🏫 paper_faculty: {len(rows)} attributions for {rows['faculty_id'].nunique()} faculty refreshed")
+    return len(rows)
+
+
+def refresh_faculty(cnx, faculty_ids):
+    """Re-attribute every paper of the given faculty, e.g. after users / faculty_scopus_map edits."""
+    faculty_ids = [str(f).strip() for f in faculty_ids if f]
+    cursor = cnx.cursor()
+    ensure_paper_faculty_table(cursor)
+    id_map = faculty_id_map(cursor)
+    id_map = id_map[id_map["faculty_id"].isin(faculty_ids)]
+    scopus_ids = id_map["scopus_id"].tolist()
+
+    columns = _author_columns(cursor)
+    insights = pd.DataFrame(columns=["doi", *columns], dtype=object)
+    if scopus_ids and columns:
+        # '|' separated cells: match whole IDs only
+        matches = " OR ".join(f"CONCAT('|', REPLACE(pi.{c}, ' ', ''), '|') LIKE %s"
+                              for c in columns for _ in scopus_ids)
+        cursor.execute(f"""
+            SELECT pi.doi, {', '.join('pi.' + c for c in columns)}
+            FROM paper_insights pi WHERE {matches}
+        """, [f"%|{i}|%" for _ in columns for i in scopus_ids])
+        insights = pd.DataFrame(cursor.fetchall(), columns=insights.columns, dtype=object)
+
+    rows = attribution_rows(insights, id_map)
+    if faculty_ids:
+        cursor.execute(f"DELETE FROM paper_faculty WHERE faculty_id IN ({', '.join(['%s'] * len(faculty_ids))})",
+                       faculty_ids)
+    _insert(cursor, rows)
+    cnx.commit()
+    cursor.close()
+    logging.info(f"👩‍🏫 paper_faculty: {len(rows)} attributions for faculty {', '.join(faculty_ids)} refreshed")
+    return len(rows)
+
+
+def _insert(cursor, rows):
+    it = rows.itertuples(index=False, name=None)
+    while batch := list(islice(it, BATCH)):
+        cursor.executemany("""
+            INSERT IGNORE INTO paper_faculty (doi, faculty_id, author_position) VALUES (%s, %s, %s)
+        """, batch)
@@ -0,0 +1,259 @@
+import logging
+import os
+import re
+import tempfile
+from itertools import islice
+
+import mysql.connector
+
+from scival_reader import INSIGHT_COLUMNS
+
+# Bulk path for SciVal uploads: every row goes into a session TEMPORARY staging table
+# (LOAD DATA LOCAL INFILE from a TSV, or batched executemany when local_infile is off),
+# and MySQL filters it against papers / paper_insights in one INSERT ... SELECT.
+STAGING_TABLE = "tmp_insight_staging"
+EXECUTEMANY_BATCH = 2000
+
+# Same types as paper_insights (db_thingies/paper_insights_migration.py): staged values are
+# cut to these lengths before hashing, so INSERT ... SELECT never hits "Data too long" and the
+# stored row hashes exactly like the staged one.
+INSIGHT_TYPES = {
+    "doi": "VARCHAR(255)",
+    "scopus_author_id_first": "VARCHAR(50)",
+    "scopus_author_id_corresponding": "VARCHAR(50)",
+    "sustainable_development_goals": "TEXT",
+    "qs_subject_code": "VARCHAR(100)",
+    "qs_subject_field_name": "VARCHAR(255)",
+    "asjc_code": "VARCHAR(100)",
+    "asjc_field_name": "VARCHAR(255)",
+    "no_of_countries": "INT",
+    "country_list": "TEXT",
+    "no_of_institutions": "INT",
+    "institution_list": "TEXT",
+    "total_authors": "INT",
+    "scopus_author_ids": "TEXT",
+}
+STAGING_DDL = ",\n".join(
+    ["doi VARCHAR(255) NOT NULL PRIMARY KEY"]
+    + [f"{c} {INSIGHT_TYPES[c]} NULL" for c in INSIGHT_COLUMNS if c != "doi"]
+    + ["content_hash CHAR(64) NULL", "changed TINYINT NOT NULL DEFAULT 0"]
+)
+INT_COLUMNS = {c for c, t in INSIGHT_TYPES.items() if t == "INT"}
+MAX_LENGTHS = {c: int(m.group(1)) for c, t in INSIGHT_TYPES.items() if (m := re.fullmatch(r"VARCHAR\((\d+)\)", t))}
+
+
+def content_hash_sql(alias, columns=INSIGHT_COLUMNS):
+    """SQL for the SHA-256 of one insight row's content (NULL and '' hash differently)."""
+    parts = ", ".join(f"COALESCE(CONCAT('=', CAST({alias}.{c} AS CHAR)), '-')" for c in columns)
+    return f"SHA2(CONCAT_WS(0x1f, {parts}), 256)"
+
+
+def ensure_content_hash(cursor):
+    """
+    Add paper_insights.content_hash (and the scopus_author_ids column it covers) and fill
+    it for rows written before it existed.
+    """
+    cursor.execute("SHOW COLUMNS FROM paper_insights LIKE 'content_hash';")
+    if not cursor.fetchone():
+        cursor.execute("ALTER TABLE paper_insights ADD COLUMN content_hash CHAR(64) NULL;")
+        logging.info("Added `content_hash` column to paper_insights table.")
+    cursor.execute("SHOW COLUMNS FROM paper_insights LIKE 'scopus_author_ids';")
+    if not cursor.fetchone():
+        cursor.execute("ALTER TABLE paper_insights ADD COLUMN scopus_author_ids TEXT NULL;")
+        logging.info("Added `scopus_author_ids` column to paper_insights table.")
+        # rows still as uploaded move to the hash over the new column set; rows edited since
+        # (e.g. SDGs from sdg_classfier.py) keep a mismatching hash, as before
+        legacy = [c for c in INSIGHT_COLUMNS if c != "scopus_author_ids"]
+        cursor.execute(f"""
+            UPDATE paper_insights pi SET pi.content_hash = {content_hash_sql('pi')}
+            WHERE pi.content_hash = {content_hash_sql('pi', legacy)};
+        """)
+    cursor.execute(f"UPDATE paper_insights pi SET pi.content_hash = {content_hash_sql('pi')} WHERE pi.content_hash IS NULL;")
+    if cursor.rowcount:
+        logging.info(f"🔑 Hashed {cursor.rowcount} existing paper_insights rows")
+
+
+# errors meaning LOAD DATA LOCAL is disabled on the client or the server
+_LOCAL_INFILE_ERRNOS = {1148, 2068, 3948}
+
+
+def insight_row(values):
+    """One INSIGHT_COLUMNS tuple: blank counts become NULL, blank text '' (as before)."""
+    out = []
+    for col, v in zip(INSIGHT_COLUMNS, values):
+        if v is None or v != v:  # None / NaN
+            out.append(None if col in INT_COLUMNS else "")
+        elif col in INT_COLUMNS:
+            try:
+                out.append(int(float(v)))
+            except (TypeError, ValueError):
+                out.append(None)
+        else:
+            out.append(str(v).strip())
+    return tuple(out)
+
+
+def valid_doi(doi):
+    return bool(doi) and doi not in ("-", "nan", "None") and len(doi) <= MAX_LENGTHS["doi"]
+
+
+def fit_row(row):
+    """(row with text cut to the paper_insights column lengths, names of the columns that were cut)."""
+    cut = [c for c, v in zip(INSIGHT_COLUMNS, row) if c in MAX_LENGTHS and v and len(v) > MAX_LENGTHS[c]]
+    if not cut:
+        return row, cut
+    return tuple(v[:MAX_LENGTHS[c]] if c in cut else v for c, v in zip(INSIGHT_COLUMNS, row)), cut
+
+
+def _tsv_field(v):
+    if v is None:
+        return "\\N"
+    return (str(v).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+class InsightStager:
+    """Collects upload rows into the staging table, spooling to a TSV for LOAD DATA."""
+
+    def __init__(self, cnx, use_load_data=True):
+        self.cnx = cnx
+        self.cursor = cnx.cursor()
+        self.use_load_data = use_load_data
+        self.staged = 0
+        self.truncated = {}
+        self.hashed = False
+        self.cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {STAGING_TABLE};")
+        self.cursor.execute(f"CREATE TEMPORARY TABLE {STAGING_TABLE} ({STAGING_DDL});")
+        self._tsv = tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="\n",
+                                                suffix=".tsv", delete=False) if use_load_data else None
+
+    def add(self, rows):
+        fitted = []
+        for r in rows:
+            if not valid_doi(r[0]):
+                continue
+            r, cut = fit_row(r)
+            for c in cut:
+                self.truncated[c] = self.truncated.get(c, 0) + 1
+            fitted.append(r)
+        rows = fitted
+        if self._tsv is not None:
+            for r in rows:
+                self._tsv.write("\t".join(map(_tsv_field, r)) + "\n")
+        else:
+            self._executemany(rows)
+        self.staged += len(rows)
+
+    def _executemany(self, rows):
+        placeholders = ", ".join(["%s"] * len(INSIGHT_COLUMNS))
+        sql = f"INSERT IGNORE INTO {STAGING_TABLE} ({', '.join(INSIGHT_COLUMNS)}) VALUES ({placeholders})"
+        rows = iter(rows)
+        while batch := list(islice(rows, EXECUTEMANY_BATCH)):
+            self.cursor.executemany(sql, batch)
+
+    def _load_tsv(self):
+        path = self._tsv.name
+        self._tsv.close()
+        self._tsv = None
+        try:
+            self.cursor.execute(f"""
+                LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE {STAGING_TABLE}
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+                LINES TERMINATED BY '\\n'
+                ({', '.join(INSIGHT_COLUMNS)})
+            """, (path.replace("\\", "/"),))
+            logging.info(f"📥 LOAD DATA staged {self.cursor.rowcount} rows")
+        except mysql.connector.Error as e:
+            if e.errno not in _LOCAL_INFILE_ERRNOS:
+                raise
+            logging.warning(f"⚠️ LOAD DATA LOCAL unavailable ({e.msg}); staging with executemany")
+            self._executemany(_read_tsv(path))
+        finally:
+            os.remove(path)
+
+    def finish(self):
+        """Make sure every added row is in the staging table."""
+        if self._tsv is not None:
+            self._load_tsv()
+
+    def _hash_staged(self):
+        self.finish()
+        if not self.hashed:
+            for col, n in self.truncated.items():
+                logging.warning(f"⚠️ {n} {col} values longer than {MAX_LENGTHS[col]} characters were truncated")
+            self.cursor.execute(f"UPDATE {STAGING_TABLE} s SET s.content_hash = {content_hash_sql('s')};")
+            # flag rows that will be written, so derived tables can refresh just those DOIs
+            self.cursor.execute(f"""
+                UPDATE {STAGING_TABLE} s
+                LEFT JOIN paper_insights pi ON pi.doi = s.doi
+                SET s.changed = (pi.doi IS NULL OR NOT (pi.content_hash <=> s.content_hash))
+                WHERE EXISTS (SELECT 1 FROM papers p WHERE p.doi = s.doi)
+            """)
+            self.hashed = True
+
+    def changed_dois_sql(self):
+        """Subquery yielding the DOIs this upload inserted or rewrote (same connection only)."""
+        return f"SELECT doi FROM {STAGING_TABLE} WHERE changed = 1"
+
+    def insert_new(self):
+        """Insert staged rows whose DOI is a known paper and not yet in paper_insights."""
+        self._hash_staged()
+        self.cursor.execute(f"""
+            INSERT IGNORE INTO paper_insights ({', '.join(INSIGHT_COLUMNS)}, content_hash)
+            SELECT {', '.join('s.' + c for c in INSIGHT_COLUMNS)}, s.content_hash
+            FROM {STAGING_TABLE} s
+            WHERE EXISTS (SELECT 1 FROM papers p WHERE p.doi = s.doi)
+              AND NOT EXISTS (SELECT 1 FROM paper_insights pi WHERE pi.doi = s.doi)
+        """)
+        inserted = self.cursor.rowcount
+        self.cnx.commit()
+        return inserted
+
+    def update_changed(self):
+        """Rewrite existing paper_insights rows whose content hash differs from the staged row."""
+        self._hash_staged()
+        self.cursor.execute(f"""
+            UPDATE paper_insights pi
+            JOIN {STAGING_TABLE} s ON s.doi = pi.doi
+            SET {', '.join(f'pi.{c} = s.{c}' for c in INSIGHT_COLUMNS[1:])},
+                pi.content_hash = s.content_hash
+            WHERE NOT (pi.content_hash <=> s.content_hash)
+        """)
+        updated = self.cursor.rowcount
+        self.cnx.commit()
+        return updated
+
+    def upsert(self):
+        """(inserted, updated): new DOIs are inserted, changed ones rewritten, unchanged ones left alone."""
+        return self.insert_new(), self.update_changed()
+
+    def close(self):
+        if self._tsv is not None:
+            self._tsv.close()
+            os.remove(self._tsv.name)
+        self.cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {STAGING_TABLE};")
+        self.cursor.close()
+
+
+def _read_tsv(path):
+    """Inverse of _tsv_field, for the executemany fallback."""
+    unescape = {"\\\\": "\\", "\\t": "\t", "\\n": "\n", "\\r": "\r"}
+    with open(path, encoding="utf-8", newline="\n") as f:
+        for line in f:
+            fields = []
+            for raw in line.rstrip("\n").split("\t"):
+                if raw == "\\N":
+                    fields.append(None)
+                    continue
+                out, i = [], 0
+                while i < len(raw):
+                    pair = raw[i:i + 2]
+                    if pair in unescape:
+                        out.append(unescape[pair])
+                        i += 2
+                    else:
+                        out.append(raw[i])
+                        i += 1
+                fields.append("".join(out))
+            yield tuple(fields)
@@ -0,0 +1,164 @@
+import logging
+import re
+import unicodedata
+from itertools import islice
+
+# ——— SCHEMA ———
+# institutions: one row per canonical institution (name as first seen, plus its match key).
+# institution_alias: extra match keys that map onto an existing institution.
+# paper_institution: (doi, institution_id) links from paper_insights.institution_list
+# and papers.affiliation1..3.
+CREATE_INSTITUTIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS institutions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    name_key VARCHAR(255) NOT NULL,
+    UNIQUE KEY uq_institution_key (name_key)
+)
+"""
+
+CREATE_ALIAS_TABLE = """
+CREATE TABLE IF NOT EXISTS institution_alias (
+    alias_key VARCHAR(255) PRIMARY KEY,
+    institution_id INT NOT NULL
+)
+"""
+
+CREATE_PAPER_INSTITUTION_TABLE = """
+CREATE TABLE IF NOT EXISTS paper_institution (
+    doi VARCHAR(255) NOT NULL,
+    institution_id INT NOT NULL,
+    PRIMARY KEY (doi, institution_id),
+    KEY idx_paper_institution_institution (institution_id)
+)
+"""
+
+# whole-word abbreviations folded before matching
+ABBREVIATIONS = {
+    "univ": "university",
+    "inst": "institute",
+    "technol": "technology",
+    "tech": "technology",
+    "sci": "science",
+    "coll": "college",
+    "dept": "department",
+    "natl": "national",
+    "intl": "international",
+    "ctr": "center",
+    "centre": "center",
+}
+PLACEHOLDERS = {"", "unknown affiliation", "unknown", "-"}
+BATCH = 5000
+
+
+def institution_key(name):
+    """Case-, accent-, punctuation- and abbreviation-insensitive match key for an institution name."""
+    if not name:
+        return ""
+    s = unicodedata.normalize("NFKD", str(name))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).casefold()
+    s = s.replace("&", " and ")
+    s = re.sub(r"[^\w\s]", " ", s)
+    words = [ABBREVIATIONS.get(w, w) for w in s.split()]
+    if words and words[0] == "the":
+        words = words[1:]
+    key = " ".join(words)
+    return "" if key in PLACEHOLDERS else key[:255]
+
+
+def split_institutions(institution_list):
+    """SciVal separates affiliation names with '|'."""
+    if not institution_list:
+        return []
+    return [part.strip() for part in str(institution_list).split("|") if part.strip()]
+
+
+def ensure_institution_tables(cursor):
+    cursor.execute(CREATE_INSTITUTIONS_TABLE)
+    cursor.execute(CREATE_ALIAS_TABLE)
+    cursor.execute(CREATE_PAPER_INSTITUTION_TABLE)
+
+
+# ——— NAME → INSTITUTION ID ———
+class InstitutionResolver:
+    """Interns institution names: alias table first, then the canonical key, else a new row."""
+
+    def __init__(self, cnx):
+        self.cursor = cnx.cursor()
+        self.cursor.execute("SELECT name_key, id FROM institutions")
+        self.by_key = dict(self.cursor.fetchall())
+        self.cursor.execute("SELECT alias_key, institution_id FROM institution_alias")
+        self.by_key.update(self.cursor.fetchall())
+        self.created = 0
+
+    def resolve(self, name):
+        key = institution_key(name)
+        if not key:
+            return None
+        if key not in self.by_key:
+            self.cursor.execute("INSERT INTO institutions (name, name_key) VALUES (%s, %s)", (str(name).strip()[:255], key))
+            self.by_key[key] = self.cursor.lastrowid
+            self.created += 1
+        return self.by_key[key]
+
+    def close(self):
+        self.cursor.close()
+
+
+def refresh_paper_institutions(cnx, doi_subquery=None):
+    """
+    Re-link the DOIs returned by doi_subquery (every paper when None) to their institutions,
+    from paper_insights.institution_list and the paper's affiliation1..3.
+    """
+    cursor = cnx.cursor()
+    ensure_institution_tables(cursor)
+    scope = f"WHERE {{alias}}.doi IN ({doi_subquery})" if doi_subquery else ""
+    cursor.execute(f"SELECT pi.doi, pi.institution_list FROM paper_insights pi {scope.format(alias='pi')}")
+    names = [(doi, n) for doi, lst in cursor.fetchall() for n in split_institutions(lst)]
+    cursor.execute(f"""
+        SELECT p.doi, p.affiliation1, p.affiliation2, p.affiliation3
+        FROM papers p {scope.format(alias='p')}
+    """)
+    names += [(doi, n) for doi, *affs in cursor.fetchall() if doi for n in affs if n]
+
+    resolver = InstitutionResolver(cnx)
+    links = {(doi, iid) for doi, n in names if (iid := resolver.resolve(n)) is not None}
+    resolver.close()
+
+    cursor.execute(f"DELETE FROM paper_institution WHERE doi IN ({doi_subquery})" if doi_subquery
+                   else "DELETE FROM paper_institution")
+    it = iter(links)
+    while batch := list(islice(it, BATCH)):
+        cursor.executemany("INSERT IGNORE INTO paper_institution (doi, institution_id) VALUES (%s, %s)", batch)
+    cnx.commit()
+    cursor.close()
+    logging.info(f"🏛️ paper_institution: {len(links)} links refreshed, {resolver.created} new institutions")
+    return len(links)
+
+
+def add_alias(cnx, alias_name, canonical_name):
+    """Map alias_name onto canonical_name's institution and move any links it already has."""
+    cursor = cnx.cursor()
+    ensure_institution_tables(cursor)
+    resolver = InstitutionResolver(cnx)
+    canonical_id = resolver.resolve(canonical_name)
+    alias_key = institution_key(alias_name)
+    cursor.execute("""
+        INSERT INTO institution_alias (alias_key, institution_id) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE institution_id = VALUES(institution_id)
+    """, (alias_key, canonical_id))
+    cursor.execute("SELECT id FROM institutions WHERE name_key = %s AND id <> %s", (alias_key, canonical_id))
+    merged = cursor.fetchone()
+    if merged:
+        cursor.execute("""
+            INSERT IGNORE INTO paper_institution (doi, institution_id)
+            SELECT doi, %s FROM paper_institution WHERE institution_id = %s
+        """, (canonical_id, merged[0]))
+        cursor.execute("DELETE FROM paper_institution WHERE institution_id = %s", (merged[0],))
+        cursor.execute("UPDATE institution_alias SET institution_id = %s WHERE institution_id = %s",
+                       (canonical_id, merged[0]))
+        cursor.execute("DELETE FROM institutions WHERE id = %s", (merged[0],))
+    cnx.commit()
+    resolver.close()
+    cursor.close()
+    logging.info(f"✅ '{alias_name}' → institution {canonical_id}" + (f" (merged {merged[0]})" if merged else ""))
@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from request_layer import DeadlineSession
+
+CROSSREF_BASE = "https://api.crossref.org/works/"
+
+
+def _load_config():
+    try:
+        with open("./config.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# Off by default: duplicating slow calls can double the load on CrossRef's polite pool.
+# Set "hedge_crossref": true in config.json to opt in.
+HEDGE_REQUESTS = bool(_load_config().get("hedge_crossref", False))
+
+# Polite pool: CrossRef routes requests that identify a contact to faster servers
+CROSSREF_MAILTO = os.environ.get("CROSSREF_MAILTO", "")
+CROSSREF_CONCURRENCY = 8   # in-flight CrossRef requests
+CROSSREF_BATCH = 20        # DOIs per filter=doi:... query
+
+# Negative entries are retried after these intervals
+RETRY_MISSING = timedelta(days=30)   # CrossRef has the DOI but no ISSN, or 404
+RETRY_ERROR = timedelta(days=1)      # timeouts, 5xx, rate limiting
+FLUSH_EVERY = 200
+
+HTTP = DeadlineSession(hedge=HEDGE_REQUESTS, max_workers=2 * CROSSREF_CONCURRENCY)
+HTTP.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=2 * CROSSREF_CONCURRENCY))
+HTTP.session.headers["User-Agent"] = "SCOPUS_SRM-quartile-updater/1.0" + (
+    f" (mailto:{CROSSREF_MAILTO})" if CROSSREF_MAILTO else ""
+)
+
+
+# ——— HELPERS ———
+def clean_issn(raw):
+    if raw is None: return None
+    s = str(raw).replace('-', '').strip().upper()
+    return s if len(s) in (7, 8) else None
+
+
+def lookup_crossref(doi):
+    """Return (issn, status) where status is 'found', 'missing' or 'error'."""
+    try:
+        r = HTTP.get(CROSSREF_BASE + doi, key="crossref")
+        if r.status_code == 404:
+            return None, "missing"
+        r.raise_for_status()
+        for i in r.json().get('message', {}).get('ISSN', []):
+            c = clean_issn(i)
+            if c:
+                return c, "found"
+        return None, "missing"
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"[CrossRef] Request failed for DOI {doi}: {e}")
+    except Exception as e:
+        logging.warning(f"[CrossRef] Unexpected error for DOI {doi}: {e}")
+    return None, "error"
+
+
+def _crossref_batch(dois):
+    """
+    Resolve up to CROSSREF_BATCH DOIs with one filter query; {doi: (issn, status)} for the
+    DOIs the response contains. Absent DOIs are left out: the page may just be partial.
+    """
+    params = {
+        "filter": ",".join(f"doi:{d}" for d in dois),
+        "select": "DOI,ISSN",
+        "rows": len(dois),
+    }
+    if CROSSREF_MAILTO:
+        params["mailto"] = CROSSREF_MAILTO
+    try:
+        r = HTTP.get(CROSSREF_BASE.rstrip("/"), key="crossref-batch", params=params)
+        if r.status_code == 429:
+            time.sleep(float(r.headers.get("Retry-After", 1)))
+            r = HTTP.get(CROSSREF_BASE.rstrip("/"), key="crossref-batch", params=params)
+        r.raise_for_status()
+        items = r.json().get("message", {}).get("items", [])
+    except Exception as e:
+        logging.warning(f"[CrossRef] Batch of {len(dois)} DOIs failed: {e}")
+        return {d: (None, "error") for d in dois}
+
+    found = {}
+    for item in items:
+        issn = next((c for c in map(clean_issn, item.get("ISSN", [])) if c), None)
+        found[item.get("DOI", "").lower()] = issn
+    out = {}
+    for d in dois:
+        if d.lower() in found:
+            issn = found[d.lower()]
+            out[d] = (issn, "found" if issn else "missing")
+    return out
+
+
+def lookup_crossref_many(dois):
+    """Resolve many DOIs concurrently, batching them into filter queries where possible."""
+    # commas would split a filter value, so those DOIs go one at a time
+    batchable = [d for d in dois if "," not in d]
+    singles = [d for d in dois if "," in d]
+    batches = [batchable[i:i + CROSSREF_BATCH] for i in range(0, len(batchable), CROSSREF_BATCH)]
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=CROSSREF_CONCURRENCY) as pool:
+        for out in pool.map(_crossref_batch, batches):
+            results.update(out)
+        # DOIs a batch did not return are only marked missing once a direct lookup agrees
+        singles += [d for d in batchable if d not in results]
+        for d, res in zip(singles, pool.map(lookup_crossref, singles)):
+            results[d] = res
+    return results
+
+
+# ——— ISSNs STORED ON papers AT SYNC TIME ———
+def ensure_issn_columns(cursor):
+    for col in ("issn", "eissn"):
+        cursor.execute("SHOW COLUMNS FROM papers LIKE %s;", (col,))
+        if not cursor.fetchone():
+            cursor.execute(f"ALTER TABLE papers ADD COLUMN {col} CHAR(8) NULL;")
+            logging.info(f"Added `{col}` column to papers table.")
+
+
+# ——— PERSISTENT DOI → ISSN CACHE ———
+CREATE_DOI_ISSN_TABLE = """
+CREATE TABLE IF NOT EXISTS doi_issn (
+    doi VARCHAR(255) PRIMARY KEY,
+    issn CHAR(8) NULL,
+    status ENUM('found', 'missing', 'error') NOT NULL,
+    fetched_at DATETIME NOT NULL,
+    retry_after DATETIME NULL
+)
+"""
+
+
+class IssnResolver:
+    """
+    Read-through DOI → ISSN cache backed by the doi_issn table. Only DOIs never seen
+    before, or negative entries whose retry_after has passed, go to CrossRef.
+    """
+
+    def __init__(self, cnx):
+        self.cnx = cnx
+        self.cursor = cnx.cursor()
+        self.cursor.execute(CREATE_DOI_ISSN_TABLE)
+        self.cnx.commit()
+        self.cursor.execute("SELECT doi, issn, status, retry_after FROM doi_issn")
+        self.cache = {doi: (issn, status, retry_after) for doi, issn, status, retry_after in self.cursor.fetchall()}
+        self.pending = []
+        self.stored = 0
+        self.hits = 0
+        self.fetched = 0
+
+    def _is_fresh(self, entry, now):
+        issn, status, retry_after = entry
+        return status == "found" or (retry_after is not None and retry_after > now)
+
+    def _store(self, doi, issn, status, now):
+        retry_after = None
+        if status == "missing":
+            retry_after = now + RETRY_MISSING
+        elif status == "error":
+            retry_after = now + RETRY_ERROR
+        self.cache[doi] = (issn, status, retry_after)
+        self.pending.append((doi, issn, status, now, retry_after))
+        if len(self.pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def prefetch(self, dois):
+        """Resolve every unseen or expired DOI up front with concurrent batched CrossRef queries."""
+        now = datetime.now()
+        todo = list({d for d in dois if d and not (d in self.cache and self._is_fresh(self.cache[d], now))})
+        if not todo:
+            return
+        logging.info(f"Resolving {len(todo)} DOIs via CrossRef ({CROSSREF_CONCURRENCY} concurrent, {CROSSREF_BATCH}/query)")
+        for doi, (issn, status) in lookup_crossref_many(todo).items():
+            self.fetched += 1
+            self._store(doi, issn, status, now)
+        self.flush()
+
+    def get(self, doi):
+        now = datetime.now()
+        entry = self.cache.get(doi)
+        if entry and self._is_fresh(entry, now):
+            self.hits += 1
+            return entry[0]
+
+        issn, status = lookup_crossref(doi)
+        self.fetched += 1
+        self._store(doi, issn, status, now)
+        return issn
+
+    def flush(self):
+        if not self.pending:
+            return
+        self.cursor.executemany("""
+            INSERT INTO doi_issn (doi, issn, status, fetched_at, retry_after)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE issn = VALUES(issn), status = VALUES(status),
+                                    fetched_at = VALUES(fetched_at), retry_after = VALUES(retry_after)
+        """, self.pending)
+        self.cnx.commit()
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.cursor.close()
+        logging.info(f"ISSN sources: {self.stored} stored on papers, {self.hits} cache hits, {self.fetched} CrossRef lookups")
@@ -0,0 +1,155 @@
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+from issn_lookup import clean_issn
+from quartile_matcher import issn_keys
+from sjr_index import QUARTILE_LABELS
+
+# ——— SCHEMA ———
+# journals: one row per venue, matched by ISSN / eISSN first and normalized name second.
+# journal_sjr: that venue's SJR quartile and score per year (from the compiled SJR index).
+CREATE_JOURNALS_TABLE = """
+CREATE TABLE IF NOT EXISTS journals (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    name_norm VARCHAR(255) NOT NULL,
+    issn CHAR(8) NULL,
+    eissn CHAR(8) NULL,
+    UNIQUE KEY uq_journal_issn (issn),
+    UNIQUE KEY uq_journal_eissn (eissn),
+    KEY idx_journal_name_norm (name_norm)
+)
+"""
+
+CREATE_JOURNAL_SJR_TABLE = """
+CREATE TABLE IF NOT EXISTS journal_sjr (
+    journal_id INT NOT NULL,
+    sjr_year SMALLINT NOT NULL,
+    quartile CHAR(2) NULL,
+    sjr FLOAT NULL,
+    PRIMARY KEY (journal_id, sjr_year),
+    KEY idx_journal_sjr_year_quartile (sjr_year, quartile)
+)
+"""
+
+UNKNOWN_NAMES = {"", "unknown", "unknown journal"}
+
+
+def normalize_journal_name(name):
+    """Case-, punctuation- and '&'-insensitive key for a publication name."""
+    if not name:
+        return ""
+    s = str(name).lower().replace("&", " and ")
+    s = re.sub(r"[^\w\s]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s[4:] if s.startswith("the ") else s
+
+
+def ensure_journal_tables(cursor):
+    cursor.execute(CREATE_JOURNALS_TABLE)
+    cursor.execute(CREATE_JOURNAL_SJR_TABLE)
+    cursor.execute("SHOW COLUMNS FROM papers LIKE 'journal_id';")
+    if not cursor.fetchone():
+        cursor.execute("ALTER TABLE papers ADD COLUMN journal_id INT NULL, ADD KEY idx_papers_journal (journal_id);")
+        logging.info("Added `journal_id` column to papers table.")
+
+
+# ——— PUBLICATION → JOURNAL ID ———
+class JournalResolver:
+    """
+    In-memory journals lookup used by the sync writers. Unknown venues are inserted on
+    first sight; the caller commits them together with the papers that reference them.
+    """
+
+    def __init__(self, cnx):
+        self.cnx = cnx
+        self.cursor = cnx.cursor()
+        self.by_issn = {}
+        self.by_name = {}
+        self.issnless = set()  # journal ids known by name only
+        self.created = 0
+        self.updated = 0
+        self.cursor.execute("SELECT id, name_norm, issn, eissn FROM journals")
+        for journal_id, name_norm, issn, eissn in self.cursor.fetchall():
+            self._remember(journal_id, name_norm, issn, eissn)
+
+    def _remember(self, journal_id, name_norm, issn, eissn):
+        for key in (issn, eissn):
+            if key:
+                self.by_issn.setdefault(key, journal_id)
+        if issn or eissn:
+            self.issnless.discard(journal_id)
+        else:
+            self.issnless.add(journal_id)
+        if name_norm:
+            self.by_name.setdefault(name_norm, journal_id)
+
+    def resolve(self, name, issn=None, eissn=None):
+        """journals.id for a publication, creating the journal if needed; None if nothing identifies it."""
+        issn, eissn = clean_issn(issn), clean_issn(eissn)
+        for key in (issn, eissn):
+            if key and key in self.by_issn:
+                return self.by_issn[key]
+
+        name_norm = normalize_journal_name(name)
+        if name_norm in UNKNOWN_NAMES:
+            name_norm = ""
+        if name_norm in self.by_name:
+            journal_id = self.by_name[name_norm]
+            if not (issn or eissn):
+                return journal_id
+            if journal_id in self.issnless:
+                # the venue was first seen without ISSNs: attach them instead of splitting it in two
+                self.cursor.execute("UPDATE journals SET issn = %s, eissn = %s WHERE id = %s",
+                                    (issn, eissn, journal_id))
+                self.updated += 1
+                self._remember(journal_id, name_norm, issn, eissn)
+                return journal_id
+        if not (name_norm or issn or eissn):
+            return None
+
+        self.cursor.execute(
+            "INSERT INTO journals (name, name_norm, issn, eissn) VALUES (%s, %s, %s, %s)",
+            ((name or "Unknown")[:255], name_norm[:255], issn, eissn)
+        )
+        journal_id = self.cursor.lastrowid
+        self.created += 1
+        self._remember(journal_id, name_norm, issn, eissn)
+        return journal_id
+
+    def close(self):
+        self.cursor.close()
+        logging.info(f"Journals: {len(set(self.by_issn.values()) | set(self.by_name.values()))} known, {self.created} created, {self.updated} given ISSNs")
+
+
+# ——— YEARLY SJR DATA PER JOURNAL ———
+def journal_sjr_frame(cursor, sjr, years=None):
+    """(journal_id, sjr_year, quartile, sjr) for every journal listed in the SJR index."""
+    cursor.execute("SELECT id, issn, eissn FROM journals")
+    journals = pd.DataFrame(cursor.fetchall(), columns=["journal_id", "issn", "eissn"])
+    years = sorted(int(y) for y in (years if years is not None else sjr.years) if sjr.has_year(y))
+    if journals.empty or not years:
+        return pd.DataFrame(columns=["journal_id", "sjr_year", "quartile", "sjr"])
+
+    cols = [sjr.column(y) for y in years]
+    issn_rows = sjr.rows(issn_keys(journals["issn"]))
+    eissn_rows = sjr.rows(issn_keys(journals["eissn"]))
+    rows = np.where(issn_rows >= 0, issn_rows, eissn_rows)
+    listed = rows >= 0
+    ids = journals["journal_id"].to_numpy()[listed]
+    codes = np.asarray(sjr.quartiles[rows[listed]][:, cols])
+    scores = np.asarray(sjr.sjr[rows[listed]][:, cols])
+
+    frames = []
+    for j, year in enumerate(years):
+        hit = codes[:, j] > 0
+        frames.append(pd.DataFrame({
+            "journal_id": ids[hit],
+            "sjr_year": year,
+            "quartile": pd.Series(QUARTILE_LABELS[codes[hit, j]], dtype=object),
+            "sjr": pd.Series(scores[hit, j].astype(float), dtype=object),
+        }))
+    return pd.concat(frames, ignore_index=True)
@@ -2,6 +2,8 @@ import pandas as pd
 import mysql.connector
 from mysql.connector import Error
 
+from faculty_attribution import refresh_paper_faculty
+
 # ---------- CONFIG ----------
 DB_CONFIG = {
     "host": "localhost",
@@ -131,6 +133,10 @@ def main():
     populate_users(conn)
     create_and_populate_mapping(conn)
 
+    # re-attribute papers to the (possibly new) Scopus IDs in users / faculty_scopus_map
+    refresh_paper_faculty(conn)
+    print("✅ paper_faculty attribution refreshed.")
+
     conn.close()
     print("\n🎉 All operations completed successfully (no duplicates, clean IDs)!")
 
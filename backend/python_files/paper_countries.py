@@ -0,0 +1,72 @@
+import logging
+from itertools import islice
+
+# ——— SCHEMA ———
+# paper_country: paper_insights.country_list exploded to one indexed row per (doi, country).
+# country_paper_count: papers per country, rebuilt after every refresh for the dashboards.
+CREATE_PAPER_COUNTRY_TABLE = """
+CREATE TABLE IF NOT EXISTS paper_country (
+    doi VARCHAR(255) NOT NULL,
+    country VARCHAR(100) NOT NULL,
+    PRIMARY KEY (doi, country),
+    KEY idx_paper_country_country (country)
+)
+"""
+
+CREATE_COUNTRY_COUNT_TABLE = """
+CREATE TABLE IF NOT EXISTS country_paper_count (
+    country VARCHAR(100) PRIMARY KEY,
+    paper_count INT NOT NULL,
+    updated_at DATETIME NOT NULL
+)
+"""
+
+BATCH = 5000
+
+
+def split_countries(country_list):
+    """'India| Japan |India' → ['India', 'Japan'] (SciVal separates countries with '|')."""
+    if not country_list:
+        return []
+    seen = []
+    for c in str(country_list).split("|"):
+        c = c.strip()
+        if c and c not in seen:
+            seen.append(c[:100])
+    return seen
+
+
+def ensure_country_tables(cursor):
+    cursor.execute(CREATE_PAPER_COUNTRY_TABLE)
+    cursor.execute(CREATE_COUNTRY_COUNT_TABLE)
+
+
+def refresh_paper_countries(cnx, doi_subquery=None):
+    """
+    Re-explode country_list for the DOIs returned by doi_subquery (every paper_insights row
+    when None) into paper_country, then rebuild country_paper_count with one GROUP BY.
+    """
+    cursor = cnx.cursor()
+    ensure_country_tables(cursor)
+    scope = f"WHERE pi.doi IN ({doi_subquery})" if doi_subquery else ""
+    cursor.execute(f"SELECT pi.doi, pi.country_list FROM paper_insights pi {scope}")
+    rows = [(doi, c) for doi, countries in cursor.fetchall() for c in split_countries(countries)]
+
+    cursor.execute(f"DELETE FROM paper_country WHERE doi IN ({doi_subquery})" if doi_subquery
+                   else "DELETE FROM paper_country")
+    it = iter(rows)
+    while batch := list(islice(it, BATCH)):
+        cursor.executemany("INSERT IGNORE INTO paper_country (doi, country) VALUES (%s, %s)", batch)
+
+    cursor.execute("DELETE FROM country_paper_count")
+    cursor.execute("""
+        INSERT INTO country_paper_count (country, paper_count, updated_at)
+        SELECT country, COUNT(*), NOW()
+        FROM paper_country
+        GROUP BY country
+    """)
+    countries = cursor.rowcount
+    cnx.commit()
+    cursor.close()
+    logging.info(f"🌍 paper_country: {len(rows)} links refreshed, {countries} countries counted")
+    return len(rows)
@@ -1,11 +1,16 @@
+import os
+import sys
 import time
-import re
-import requests
-import pandas as pd
 import mysql.connector
 from mysql.connector import errorcode
 import logging
 
+from issn_lookup import ensure_issn_columns, IssnResolver
+from journals import ensure_journal_tables
+from sjr_index import SjrIndex, file_fingerprint
+from quartile_matcher import load_papers, match_quartiles
+from quartile_writer import bulk_update_paper_quartiles, create_applied_table, changed_years, mark_applied
+
 # ——— SETUP LOGGING ———
 logging.basicConfig(
     level=logging.INFO,
@@ -28,58 +33,14 @@ SJR_FILES = {
     2024: 'scimagojr2024.csv',
     2023: 'scimagojr2023.csv',
 }
+APPLIED_TARGET = "papers.quartile"
 
-CROSSREF_BASE = "https://api.crossref.org/works/"
-
-# ——— HELPERS ———
-def clean_issn(raw):
-    if pd.isna(raw): return None
-    s = str(raw).replace('-', '').strip().upper()
-    return s if len(s) in (7, 8) else None
-
-def fetch_first_issn(doi):
-    try:
-        url = CROSSREF_BASE + doi
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        issns = r.json().get('message', {}).get('ISSN', [])
-        for i in issns:
-            c = clean_issn(i)
-            if c:
-                logging.debug(f"DOI {doi} → ISSN {c}")
-                return c
-    except requests.exceptions.RequestException as e:
-        logging.warning(f"[fetch_first_issn] Request failed for DOI {doi}: {e}")
-    except Exception as e:
-        logging.warning(f"[fetch_first_issn] Unexpected error for DOI {doi}: {e}")
-    return None
-
-# ——— 1. Build combined ISSN→Quartile map ———
-issn_to_quart = {}
-for year in sorted(SJR_FILES.keys()):
-    try:
-        df = pd.read_csv(SJR_FILES[year], delimiter=';', encoding='utf-8-sig')
-        added = 0
-        for raw_issns, q in zip(df['Issn'], df['SJR Best Quartile']):
-            if pd.isna(raw_issns): continue
-            for part in re.split(r'[^0-9A-Za-z]+', str(raw_issns)):
-                clean = clean_issn(part)
-                if clean:
-                    if clean not in issn_to_quart or year == max(SJR_FILES):
-                        issn_to_quart[clean] = q
-                        added += 1
-        logging.info(f"Loaded {added} quartile entries from {SJR_FILES[year]}")
-    except Exception as e:
-        logging.error(f"Failed to load {SJR_FILES[year]}: {e}")
+# --full re-matches every paper; otherwise, when SJR_FILES are unchanged since the last
+# run, only papers that have no quartile yet are matched.
+FULL = "--full" in sys.argv
+fingerprints = {y: file_fingerprint(f) for y, f in SJR_FILES.items() if os.path.exists(f)}
 
-# ——— Debug check ———
-test_issn = "14327643"
-if test_issn in issn_to_quart:
-    logging.info(f"✅ ISSN {test_issn} is in the quartile map with value: {issn_to_quart[test_issn]}")
-else:
-    logging.error(f"[DEBUG] ISSN {test_issn} is NOT in the quartile map")
-
-# ——— 2. Connect to MySQL ———
+# ——— 1. Connect to MySQL ———
 try:
     cnx = mysql.connector.connect(**DB_CONFIG)
     logging.info("Connected to MySQL.")
@@ -89,7 +50,7 @@ except mysql.connector.Error as err:
 
 cursor = cnx.cursor()
 
-# ——— 3. Ensure 'quartile' column exists ———
+# ——— 2. Ensure 'quartile' column exists ———
 try:
     cursor.execute("ALTER TABLE papers ADD COLUMN quartile VARCHAR(4) NULL;")
     cnx.commit()
@@ -100,44 +61,47 @@ except mysql.connector.Error as err:
     else:
         raise
 
-# ——— 4. Fetch DOIs ———
-cursor.execute("SELECT doi FROM papers;")
-papers = cursor.fetchall()
+ensure_issn_columns(cursor)
+ensure_journal_tables(cursor)
+create_applied_table(cursor)
+cnx.commit()
+changed = changed_years(cursor, APPLIED_TARGET, fingerprints)
+incremental = not FULL and not changed
+logging.info(f"Mode: {'incremental' if incremental else 'full'} (changed SJR years: {changed or 'none'})")
+
+# ——— 3. Load the compiled SJR index ———
+sjr = SjrIndex.load_or_build(SJR_FILES, refresh=changed)
+for year in SJR_FILES:
+    logging.info(f"✅ Loaded {len(sjr.year(year))} ISSN→Quartile entries for {year}")
+
+# ——— Debug check ———
+test_issn = "14327643"
+if sjr.row(test_issn) >= 0:
+    logging.info(f"✅ ISSN {test_issn} is in the SJR index")
+else:
+    logging.error(f"[DEBUG] ISSN {test_issn} is NOT in the SJR index")
+
+# ——— 4. Fetch papers (ISSNs from sync time, else cache / CrossRef) ———
+resolver = IssnResolver(cnx)
+papers = load_papers(cursor, resolver, where="WHERE quartile IS NULL OR quartile = ''" if incremental else "")
 logging.info(f"Fetched {len(papers)} papers from DB.")
 
-# ——— 5. Loop and update ———
-update_sql = "UPDATE papers SET quartile = %s WHERE doi = %s;"
-matched = 0
-unmatched = 0
-missing_doi = 0
-
-for idx, (doi,) in enumerate(papers, start=1):
-    if not doi:
-        missing_doi += 1
-        logging.warning(f"[{idx}] Paper has no DOI, skipping.")
-        continue
-
-    issn = fetch_first_issn(doi)
-    issn_clean = clean_issn(issn)
-    quart = issn_to_quart.get(issn_clean)
-
-    if quart:
-        matched += 1
-        logging.info(f"[{idx}] Match: DOI {doi} → ISSN {issn_clean} → Quartile {quart}")
-        cursor.execute(update_sql, (quart, doi))
-    else:
-        unmatched += 1
-        logging.warning(f"[{idx}] No quartile match for ISSN {issn_clean} (DOI: {doi})")
+has_doi = papers["doi"].notna() & (papers["doi"] != "")
+missing_doi = int((~has_doi).sum())
+papers = papers[has_doi]
 
-    if idx % 100 == 0:
-        cnx.commit()
-        logging.info(f"Committed batch up to paper #{idx}")
+# ——— 5. Match every paper in one pass, then one set-based update ———
+result = match_quartiles(papers, sjr, SJR_FILES)
+matches = result[result["quartile"].notna()]
+matched = len(matches)
+unmatched = len(result) - matched
 
-cnx.commit()
-logging.info("✅ Final commit complete.")
-logging.info(f"Total: {len(papers)} | Matched: {matched} | Unmatched ISSN: {unmatched} | Missing DOI: {missing_doi}")
+bulk_update_paper_quartiles(cnx, matches)
+mark_applied(cnx, APPLIED_TARGET, fingerprints, SJR_FILES)
+logging.info(f"Total: {len(papers) + missing_doi} | Matched: {matched} | Unmatched ISSN: {unmatched} | Missing DOI: {missing_doi}")
 
 # ——— 6. Cleanup ———
+resolver.close()
 cursor.close()
 cnx.close()
 logging.info("Closed MySQL connection.")
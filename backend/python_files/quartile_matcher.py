@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from sjr_index import QUARTILE_LABELS
+
+PAPER_COLUMNS = ["doi", "scopus_id", "issn", "eissn", "pub_year"]
+
+
+def issn_keys(series):
+    """Vectorized sjr_index.issn_key over a Series of raw ISSN strings (clean_issn rules)."""
+    s = series.fillna("").astype(str).str.replace("-", "", regex=False).str.strip().str.upper()
+    ok_len = s.str.len().isin((7, 8))
+    s = s.str.zfill(8)
+    valid = ok_len & s.str.fullmatch(r"\d{7}[\dX]")
+    body = pd.to_numeric(s.str[:7].where(valid), errors="coerce")
+    check = pd.to_numeric(s.str[7].where(valid).replace("X", "10"), errors="coerce")
+    keys = body * 11 + check
+    return keys.fillna(-1).astype(np.int64).to_numpy()
+
+
+def has_issn(papers):
+    return (issn_keys(papers["issn"]) >= 0) | (issn_keys(papers["eissn"]) >= 0)
+
+
+def load_papers(cursor, resolver, where="WHERE doi IS NOT NULL"):
+    """
+    papers as a PAPER_COLUMNS DataFrame. ISSNs come from the paper, else its journal;
+    papers with neither get one from the DOI → ISSN cache / CrossRef (resolved up front
+    in concurrent batches).
+    """
+    cursor.execute(f"""
+        SELECT papers.doi, papers.scopus_id,
+               COALESCE(papers.issn, j.issn), COALESCE(papers.eissn, j.eissn), YEAR(papers.date)
+        FROM papers
+        LEFT JOIN journals j ON j.id = papers.journal_id
+        {where};
+    """)
+    papers = pd.DataFrame(cursor.fetchall(), columns=PAPER_COLUMNS)
+    need = ~has_issn(papers) & papers["doi"].notna() & (papers["doi"] != "")
+    resolver.stored += int(has_issn(papers).sum())
+    resolver.prefetch(papers.loc[need, "doi"])
+    papers["issn"] = papers["issn"].astype(object)
+    papers.loc[need, "issn"] = papers.loc[need, "doi"].map(resolver.get)
+    return papers
+
+
+def missing_quartile_where(years, table="paper_quartile"):
+    """WHERE clause selecting only papers with no table row for at least one of years."""
+    missing = " OR ".join(
+        f"NOT EXISTS (SELECT 1 FROM {table} q WHERE q.doi = papers.doi AND q.sjr_year = {int(y)})"
+        for y in years
+    )
+    return f"WHERE doi IS NOT NULL AND ({missing})"
+
+
+def match_quartiles(papers, sjr, years=None):
+    """
+    Assign quartiles for every paper and every SJR year in one pass.
+
+    papers: DataFrame with PAPER_COLUMNS (issn/eissn may be empty).
+    Returns papers plus matched_issn_key, quartile_<year> for each year, quartile (combined:
+    latest year wins, else earliest listing year) and quartile_pub_year (SJR year == pub_year).
+    """
+    years = sorted(int(y) for y in (years if years is not None else sjr.years) if sjr.has_year(y))
+    cols = [sjr.column(y) for y in years]
+    out = papers.copy()
+
+    issn_rows = sjr.rows(issn_keys(out["issn"]))
+    eissn_rows = sjr.rows(issn_keys(out["eissn"]))
+
+    # print ISSN if any selected year lists it, else eISSN
+    def codes_for(rows):
+        codes = np.zeros((len(rows), len(cols)), dtype=np.uint8)
+        hit = rows >= 0
+        if hit.any() and cols:
+            codes[hit] = np.asarray(sjr.quartiles[rows[hit]][:, cols])
+        return codes
+
+    issn_codes = codes_for(issn_rows)
+    eissn_codes = codes_for(eissn_rows)
+    use_issn = issn_codes.any(axis=1)
+    codes = np.where(use_issn[:, None], issn_codes, eissn_codes)
+    matched_rows = np.where(use_issn, issn_rows, eissn_rows)
+    all_keys = np.asarray(sjr.issn_keys, dtype=np.int64)
+    out["matched_issn_key"] = np.where(matched_rows >= 0, all_keys[np.maximum(matched_rows, 0)], -1) \
+        if len(all_keys) else -1
+
+    labels = np.where(codes > 0, QUARTILE_LABELS[codes], None)
+    for j, year in enumerate(years):
+        out[f"quartile_{year}"] = pd.Series(labels[:, j], index=out.index, dtype=object)
+
+    # combined: latest year, else the earliest year that lists the journal
+    combined = np.full(len(out), None, dtype=object)
+    order = list(range(len(years)))
+    for j in order[-1:] + order[:-1]:
+        fill = pd.isna(combined) & (codes[:, j] > 0)
+        combined[fill] = labels[fill, j]
+    out["quartile"] = pd.Series(combined, index=out.index, dtype=object)
+
+    pub_year = pd.to_numeric(out["pub_year"], errors="coerce").to_numpy()
+    by_pub_year = np.full(len(out), None, dtype=object)
+    for j, year in enumerate(years):
+        same = pub_year == year
+        by_pub_year[same] = labels[same, j]
+    out["quartile_pub_year"] = pd.Series(by_pub_year, index=out.index, dtype=object)
+    return out
@@ -0,0 +1,192 @@
+import logging
+import os
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Set-based writes: results are bulk-loaded into a session TEMPORARY table with one
+# multi-row INSERT (mysql-connector folds executemany INSERTs into a single statement)
+# and applied with one UPDATE ... JOIN / INSERT ... SELECT and one commit.
+
+
+def _records(df, columns):
+    """DataFrame columns → list of tuples with NaN/NA turned into None for the driver."""
+    part = df[columns].astype(object)
+    return [tuple(row) for row in part.where(pd.notna(part), None).itertuples(index=False)]
+
+
+def _load_temp(cursor, name, ddl, columns, rows):
+    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {name};")
+    cursor.execute(f"CREATE TEMPORARY TABLE {name} ({ddl});")
+    if rows:
+        placeholders = ", ".join(["%s"] * len(columns))
+        cursor.executemany(
+            f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({placeholders})",
+            rows
+        )
+
+
+def bulk_update_paper_quartiles(cnx, df):
+    """papers.quartile = df.quartile for every df.doi, in one UPDATE ... JOIN."""
+    cursor = cnx.cursor()
+    rows = _records(df.drop_duplicates("doi"), ["doi", "quartile"])
+    _load_temp(cursor, "tmp_paper_quartile",
+               "doi VARCHAR(255) PRIMARY KEY, quartile VARCHAR(4)",
+               ["doi", "quartile"], rows)
+    cursor.execute("""
+        UPDATE papers p
+        JOIN tmp_paper_quartile t ON p.doi = t.doi
+        SET p.quartile = t.quartile;
+    """)
+    updated = cursor.rowcount
+    cnx.commit()
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_paper_quartile;")
+    cursor.close()
+    logging.info(f"✅ Bulk-updated quartile on {updated} papers ({len(rows)} DOIs loaded)")
+    return updated
+
+
+# ——— LONG-FORMAT YEAR-WISE QUARTILES ———
+# One row per (doi, sjr_year): a new SJR year is just more rows, never a new column.
+QUARTILE_TABLE = "paper_quartile"
+
+
+def create_quartile_table(cursor, table=QUARTILE_TABLE):
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        doi VARCHAR(255) NOT NULL,
+        sjr_year SMALLINT NOT NULL,
+        scopus_id VARCHAR(50),
+        quartile CHAR(2) NOT NULL,
+        PRIMARY KEY (doi, sjr_year),
+        KEY idx_year_quartile (sjr_year, quartile)
+    );
+    """)
+
+
+def long_quartiles(df, years):
+    """quartile_<year> columns of a match_quartiles result → (doi, sjr_year, scopus_id, quartile) rows."""
+    wide = df.drop_duplicates("doi")[["doi", "scopus_id", *(f"quartile_{y}" for y in years)]]
+    long = wide.melt(id_vars=["doi", "scopus_id"], var_name="sjr_year", value_name="quartile")
+    long = long[long["quartile"].notna()]
+    long["sjr_year"] = long["sjr_year"].str[len("quartile_"):].astype(int)
+    return long[["doi", "sjr_year", "scopus_id", "quartile"]]
+
+
+def bulk_upsert_year_quartiles(cnx, df, years, table=QUARTILE_TABLE):
+    """
+    INSERT ... SELECT the given years' quartiles from a temp table into table,
+    replacing the quartile of any (doi, sjr_year) already present.
+    """
+    cursor = cnx.cursor()
+    columns = ["doi", "sjr_year", "scopus_id", "quartile"]
+    rows = _records(long_quartiles(df, years), columns)
+    _load_temp(cursor, "tmp_year_quartile",
+               "doi VARCHAR(255), sjr_year SMALLINT, scopus_id VARCHAR(50), quartile CHAR(2), "
+               "PRIMARY KEY (doi, sjr_year)",
+               columns, rows)
+    cursor.execute(f"""
+        INSERT INTO {table} (doi, sjr_year, scopus_id, quartile)
+        SELECT t.doi, t.sjr_year, t.scopus_id, t.quartile
+        FROM tmp_year_quartile t
+        ON DUPLICATE KEY UPDATE scopus_id = t.scopus_id, quartile = t.quartile;
+    """)
+    cnx.commit()
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_year_quartile;")
+    cursor.close()
+    logging.info(f"✅ Bulk-upserted {len(rows)} rows into {table} (years {', '.join(map(str, years))})")
+    return len(rows)
+
+
+def bulk_upsert_journal_sjr(cnx, df):
+    """journal_sjr rows (journal_id, sjr_year, quartile, sjr) in one INSERT ... SELECT."""
+    cursor = cnx.cursor()
+    columns = ["journal_id", "sjr_year", "quartile", "sjr"]
+    rows = _records(df, columns)
+    _load_temp(cursor, "tmp_journal_sjr",
+               "journal_id INT, sjr_year SMALLINT, quartile CHAR(2), sjr FLOAT, PRIMARY KEY (journal_id, sjr_year)",
+               columns, rows)
+    cursor.execute("""
+        INSERT INTO journal_sjr (journal_id, sjr_year, quartile, sjr)
+        SELECT t.journal_id, t.sjr_year, t.quartile, t.sjr
+        FROM tmp_journal_sjr t
+        ON DUPLICATE KEY UPDATE quartile = t.quartile, sjr = t.sjr;
+    """)
+    cnx.commit()
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_journal_sjr;")
+    cursor.close()
+    logging.info(f"✅ Bulk-upserted {len(rows)} rows into journal_sjr")
+    return len(rows)
+
+
+# ——— APPLIED SJR FILES (incremental runs) ———
+# target is the table a quartile job writes plus the job's SJR source (e.g. "paper_quartile:upload"),
+# so jobs that share a table never see each other's files as a changed source.
+def create_applied_table(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS sjr_file_applied (
+        target VARCHAR(64) NOT NULL,
+        sjr_year SMALLINT NOT NULL,
+        sha256 CHAR(64) NOT NULL,
+        file_name VARCHAR(255),
+        applied_at DATETIME NOT NULL,
+        PRIMARY KEY (target, sjr_year)
+    );
+    """)
+
+
+def changed_years(cursor, target, fingerprints):
+    """Years of {year: sha256} whose file differs from the one last applied to target."""
+    cursor.execute("SELECT sjr_year, sha256 FROM sjr_file_applied WHERE target = %s;", (target,))
+    applied = dict(cursor.fetchall())
+    return sorted(y for y, digest in fingerprints.items() if applied.get(y) != digest)
+
+
+def mark_applied(cnx, target, fingerprints, file_names):
+    cursor = cnx.cursor()
+    cursor.executemany("""
+        INSERT INTO sjr_file_applied (target, sjr_year, sha256, file_name, applied_at)
+        VALUES (%s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE sha256 = VALUES(sha256), file_name = VALUES(file_name),
+                                applied_at = VALUES(applied_at)
+    """, [(target, y, digest, os.path.basename(file_names[y])) for y, digest in fingerprints.items()])
+    cnx.commit()
+    cursor.close()
+
+
+@contextmanager
+def table_write_lock(cnx, table, timeout=600):
+    """
+    Session-level named lock around writes to table, so a shadow rebuild's carry-over copy
+    and RENAME cannot interleave with another job's upserts into the live table.
+    """
+    cursor = cnx.cursor()
+    name = f"quartile_write:{table}"
+    cursor.execute("SELECT GET_LOCK(%s, %s);", (name, timeout))
+    if cursor.fetchone()[0] != 1:
+        cursor.close()
+        raise RuntimeError(f"Timed out after {timeout}s waiting for the {table} write lock")
+    try:
+        yield
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s);", (name,))
+        cursor.fetchall()
+        cursor.close()
+
+
+def swap_in_shadow(cnx, table):
+    """
+    Atomically replace table with {table}_shadow. Readers see either the old or the new
+    table, never an empty or partially rebuilt one.
+    """
+    cursor = cnx.cursor()
+    shadow, old = f"{table}_shadow", f"{table}_old"
+    cursor.execute(f"DROP TABLE IF EXISTS {old};")
+    cursor.execute("SHOW TABLES LIKE %s;", (table,))
+    if cursor.fetchone():
+        cursor.execute(f"RENAME TABLE {table} TO {old}, {shadow} TO {table};")
+        cursor.execute(f"DROP TABLE {old};")
+    else:
+        cursor.execute(f"RENAME TABLE {shadow} TO {table};")
+    cursor.close()
+    logging.info(f"✅ Swapped rebuilt {shadow} into {table}")
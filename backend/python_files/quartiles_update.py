@@ -1,14 +1,17 @@
-import time
 import re
 import sys
 import os
-import requests
-import pandas as pd
 import mysql.connector
-from collections import defaultdict
 import logging
 from datetime import datetime
 
+from issn_lookup import ensure_issn_columns, IssnResolver
+from journals import ensure_journal_tables, journal_sjr_frame
+from sjr_index import SjrIndex, file_fingerprint
+from quartile_matcher import load_papers, match_quartiles, missing_quartile_where
+from quartile_writer import (QUARTILE_TABLE, create_quartile_table, bulk_upsert_year_quartiles, table_write_lock,
+                             create_applied_table, changed_years, mark_applied, bulk_upsert_journal_sjr)
+
 # ——— SETUP LOGGING ———
 logging.basicConfig(
     level=logging.INFO,
@@ -26,29 +29,9 @@ DB_CONFIG = {
     'host':     'localhost',
     'database': 'scopus'
 }
-
-CROSSREF_BASE = "https://api.crossref.org/works/"
+APPLIED_TARGET = f"{QUARTILE_TABLE}:upload"
 
 # ——— HELPERS ———
-def clean_issn(raw):
-    if pd.isna(raw): return None
-    s = str(raw).replace('-', '').strip().upper()
-    return s if len(s) in (7, 8) else None
-
-def fetch_first_issn(doi):
-    try:
-        url = CROSSREF_BASE + doi
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        issns = r.json().get('message', {}).get('ISSN', [])
-        for i in issns:
-            c = clean_issn(i)
-            if c:
-                return c
-    except Exception as e:
-        logging.warning(f"[CrossRef] Failed to fetch ISSN for DOI {doi}: {e}")
-    return None
-
 def infer_year_from_filename(filename: str):
     match = re.search(r"(20\d{2})", filename)
     if match:
@@ -57,7 +40,11 @@ def infer_year_from_filename(filename: str):
         return datetime.now().year  # fallback
 
 # ——— MAIN FUNCTION ———
-def process_uploaded_file(file_path: str):
+def process_uploaded_file(file_path: str, full: bool = False):
+    """
+    Apply one uploaded SJR file. Unless full is set, a file already applied (same sha256)
+    is not recompiled and only papers with no quartile for its year are matched.
+    """
     if not os.path.exists(file_path):
         logging.error(f"File not found: {file_path}")
         return
@@ -65,24 +52,8 @@ def process_uploaded_file(file_path: str):
     # Determine year from filename
     year = infer_year_from_filename(file_path)
     colname = f"quartile_{year}"
-    logging.info(f"Processing upload for year {year} → column {colname}")
-
-    # Load file
-    try:
-        df = pd.read_csv(file_path, delimiter=';', encoding='utf-8-sig')
-    except Exception as e:
-        logging.error(f"Failed to read {file_path}: {e}")
-        return
-
-    # Build ISSN→Quartile map
-    issn_quart = {}
-    for raw_issns, q in zip(df['Issn'], df['SJR Best Quartile']):
-        if pd.isna(raw_issns) or pd.isna(q): continue
-        for part in re.split(r'[^0-9A-Za-z]+', str(raw_issns)):
-            issn = clean_issn(part)
-            if issn:
-                issn_quart[issn] = q
-    logging.info(f"✅ Loaded {len(issn_quart)} ISSN→Quartile entries")
+    fingerprint = {year: file_fingerprint(file_path)}
+    logging.info(f"Processing upload for SJR year {year}")
 
     # Connect DB
     try:
@@ -93,63 +64,57 @@ def process_uploaded_file(file_path: str):
         logging.critical(f"MySQL connection failed: {err}")
         return
 
-    # Ensure summary table exists
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS faculty_quartile_summary (
-        scopus_id VARCHAR(50),
-        doi VARCHAR(255) PRIMARY KEY
-    );
-    """)
+    # Long-format (doi, sjr_year, quartile) table: a new year needs no DDL
+    create_quartile_table(cursor)
+    create_applied_table(cursor)
     cnx.commit()
 
-    # Ensure new year column exists
-    cursor.execute("SHOW COLUMNS FROM faculty_quartile_summary LIKE %s;", (colname,))
-    if not cursor.fetchone():
-        alter_sql = f"ALTER TABLE faculty_quartile_summary ADD COLUMN {colname} VARCHAR(2);"
-        cursor.execute(alter_sql)
-        cnx.commit()
-        logging.info(f"✅ Added new column: {colname}")
+    incremental = not full and not changed_years(cursor, APPLIED_TARGET, fingerprint)
 
-    # Fetch DOIs
-    cursor.execute("SELECT scopus_id, doi FROM papers WHERE doi IS NOT NULL;")
-    papers = cursor.fetchall()
+    # Compile the uploaded file into the SJR index, unless this exact file is already in it
+    try:
+        sjr = SjrIndex.load_or_build({}) if incremental else None
+        if sjr is None or not sjr.has_year(year):
+            sjr = SjrIndex.add_year(file_path, year)
+    except Exception as e:
+        logging.error(f"Failed to read {file_path}: {e}")
+        cursor.close()
+        cnx.close()
+        return
+    logging.info(f"✅ Loaded {len(sjr.year(year))} ISSN→Quartile entries")
+
+    # Fetch papers (ISSNs from sync time, else cache / CrossRef)
+    ensure_issn_columns(cursor)
+    ensure_journal_tables(cursor)
+    resolver = IssnResolver(cnx)
+    if incremental:
+        logging.info(f"{os.path.basename(file_path)} was already applied; matching only papers without a {year} quartile")
+        papers = load_papers(cursor, resolver, where=missing_quartile_where([year], QUARTILE_TABLE))
+    else:
+        papers = load_papers(cursor, resolver)
     logging.info(f"Fetched {len(papers)} papers with DOIs.")
 
-    # Insert or update one by one
-    for idx, (scopus_id, doi) in enumerate(papers, 1):
-        issn = fetch_first_issn(doi)
-        if not issn:
-            logging.warning(f"[{idx}] No ISSN found for DOI {doi}")
-            continue
-
-        quart = issn_quart.get(issn)
-        if not quart:
-            logging.warning(f"[{idx}] No quartile mapping found for ISSN {issn}")
-            continue
-
-        try:
-            # Insert if new row, else update
-            sql = f"""
-            INSERT INTO faculty_quartile_summary (scopus_id, doi, {colname})
-            VALUES (%s, %s, %s)
-            ON DUPLICATE KEY UPDATE {colname} = VALUES({colname});
-            """
-            cursor.execute(sql, (scopus_id, doi, quart))
-            cnx.commit()
-            logging.info(f"[{idx}] {doi} → {colname}:{quart}")
-        except Exception as e:
-            logging.error(f"[{idx}] Failed to insert/update {doi}: {e}")
-
-        if idx % 50 == 0:
-            time.sleep(1)
-
+    # Match all papers against this year in one pass, then one set-based upsert
+    result = match_quartiles(papers, sjr, [year])
+    matched = result[result[colname].notna()]
+    logging.info(f"{len(matched)} papers matched a {year} quartile, {len(result) - len(matched)} unmatched")
+    try:
+        with table_write_lock(cnx, QUARTILE_TABLE):  # not while year_wise_quartile.py swaps the table
+            bulk_upsert_year_quartiles(cnx, matched, [year])
+        bulk_upsert_journal_sjr(cnx, journal_sjr_frame(cursor, sjr, [year]))
+        mark_applied(cnx, APPLIED_TARGET, fingerprint, {year: file_path})
+    except (mysql.connector.Error, RuntimeError) as e:
+        logging.error(f"Failed to write {year} quartiles to {QUARTILE_TABLE}: {e}")
+
+    resolver.close()
     cursor.close()
     cnx.close()
     logging.info("✅ Finished processing uploaded file")
 
 # ——— ENTRY POINT ———
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python faculty_quartile_from_upload.py <csv_file>")
+    args = [a for a in sys.argv[1:] if a != "--full"]
+    if not args:
+        print("Usage: python quartiles_update.py <csv_file> [--full]")
         sys.exit(1)
-    process_uploaded_file(sys.argv[1])
+    process_uploaded_file(args[0], full="--full" in sys.argv)
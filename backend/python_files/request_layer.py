@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+import requests
+
+# ——— DEFAULTS ———
+DEFAULT_TIMEOUT = 10      # used until enough latency samples have been observed
+MIN_TIMEOUT = 2
+MAX_TIMEOUT = 30
+DEADLINE_FACTOR = 2.0     # deadline = p99 * factor, clamped to [MIN_TIMEOUT, MAX_TIMEOUT]
+LATENCY_WINDOW = 200      # rolling samples kept per endpoint
+MIN_SAMPLES = 20          # samples needed before percentiles are trusted
+MIN_HEDGE_BUDGET = 0.05   # seconds; no hedge is sent with less of the deadline left
+
+
+# ——— LATENCY TRACKING ———
+class LatencyTracker:
+    """Rolling per-endpoint latency samples with percentile lookups."""
+
+    def __init__(self, window=LATENCY_WINDOW, min_samples=MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def percentile(self, key, pct):
+        """Return the pct-th percentile for key, or None while there are too few samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        idx = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[idx]
+
+    def snapshot(self):
+        with self._lock:
+            keys = list(self._samples)
+        out = {}
+        for key in keys:
+            out[key] = {
+                "count": len(self._samples[key]),
+                "p50": self.percentile(key, 50),
+                "p95": self.percentile(key, 95),
+                "p99": self.percentile(key, 99),
+            }
+        return out
+
+
+# ——— DEADLINE / HEDGED GET ———
+class DeadlineSession:
+    """
+    Keep-alive GET client whose per-call deadline follows the observed latency of
+    each endpoint. With hedge=True a duplicate request is sent once a call runs past
+    the endpoint's p95, and whichever response arrives first wins.
+    """
+
+    def __init__(self, tracker=None, hedge=False, default_timeout=DEFAULT_TIMEOUT,
+                 min_timeout=MIN_TIMEOUT, max_timeout=MAX_TIMEOUT,
+                 deadline_factor=DEADLINE_FACTOR, max_workers=8, session=None):
+        self.tracker = tracker or LatencyTracker()
+        self.hedge = hedge
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.deadline_factor = deadline_factor
+        self.session = session or requests.Session()
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.deadlines_hit = 0
+        self._pool = ThreadPoolExecutor(max_workers=max_workers) if hedge else None
+
+    def deadline_for(self, key):
+        p99 = self.tracker.percentile(key, 99)
+        if p99 is None:
+            return self.default_timeout
+        return max(self.min_timeout, min(self.max_timeout, p99 * self.deadline_factor))
+
+    def hedge_after(self, key):
+        return self.tracker.percentile(key, 95)
+
+    def _timed_get(self, url, key, timeout, kwargs):
+        """GET and record its latency; failures and timeouts are recorded at their elapsed time too,
+        so slow endpoints push the percentiles up instead of only their fast successes counting."""
+        start = time.monotonic()
+        try:
+            r = self.session.get(url, timeout=timeout, **kwargs)
+        finally:
+            self.tracker.record(key, time.monotonic() - start)
+        return r
+
+    def get(self, url, key=None, throttle=None, **kwargs):
+        """
+        GET url within the endpoint deadline; raises requests.Timeout when it is exceeded.
+        throttle, when given, is called before every request sent, hedges included.
+        """
+        key = key or urlparse(url).netloc
+        deadline = self.deadline_for(key)
+        hedge_after = self.hedge_after(key) if self.hedge else None
+        if throttle:
+            throttle()
+
+        if hedge_after is None or hedge_after >= deadline:
+            try:
+                return self._timed_get(url, key, deadline, kwargs)
+            except requests.exceptions.Timeout:
+                self.deadlines_hit += 1
+                raise
+
+        start = time.monotonic()
+        primary = self._pool.submit(self._timed_get, url, key, deadline, kwargs)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        hedged = None
+        remaining = deadline - (time.monotonic() - start)
+        if throttle and remaining >= MIN_HEDGE_BUDGET:
+            throttle()  # a hedge counts against the endpoint's rate limit like any request
+            remaining = deadline - (time.monotonic() - start)
+        if remaining < MIN_HEDGE_BUDGET or primary.done():
+            # too little time left for a duplicate to help (a 0 timeout is rejected by urllib3),
+            # or the primary answered while the hedge waited on the throttle
+            pending = {primary}
+        else:
+            self.hedges_sent += 1
+            hedged = self._pool.submit(self._timed_get, url, key, remaining, kwargs)
+            pending = {primary, hedged}
+        last_error = None
+        while pending:
+            remaining = deadline - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    r = fut.result()
+                except requests.exceptions.RequestException as e:
+                    last_error = e
+                    continue
+                if fut is hedged:
+                    self.hedges_won += 1
+                return r
+
+        if last_error is not None and not isinstance(last_error, requests.exceptions.Timeout):
+            raise last_error
+        self.deadlines_hit += 1
+        raise requests.exceptions.Timeout(f"Deadline of {deadline:.1f}s exceeded for {url}")
+
+    def stats(self):
+        return {
+            "latency": self.tracker.snapshot(),
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "deadlines_hit": self.deadlines_hit,
+        }
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False)
+        self.session.close()
@@ -1,5 +1,14 @@
-import pandas as pd
+import csv
+import os
+import sys
+
 import mysql.connector
+from openpyxl import Workbook
+
+from faculty_attribution import clean_ids
+from scival_reader import iter_chunks, read_header
+
+AUTHOR_IDS_COLUMN = 'Scopus Author Ids'
 
 # DB CONFIG
 DB_CONFIG = {
@@ -18,21 +27,78 @@ def get_scopus_ids_from_db():
     conn.close()
     return ids
 
-# Filter Excel rows
+# Rows whose '|' separated author ID cell contains an allowed ID (one explode + isin, no per-row Python)
+def has_allowed_id(cells, allowed_ids):
+    ids = cells.dropna().astype(str).str.replace(r"[\r\n]", "", regex=True).str.split("|").explode()
+    ids = clean_ids(ids)
+    return cells.index.isin(ids.index[ids.isin(allowed_ids)])
+
+# Output writers: (append_row, close) pairs that never hold more than one chunk in memory
+def xlsx_writer(path, header):
+    wb = Workbook(write_only=True)  # rows are streamed to disk, not kept as cell objects
+    ws = wb.create_sheet("Filtered")
+    ws.append(header)
+    return ws.append, lambda: wb.save(path)
+
+def csv_writer(path, header):
+    f = open(path, "w", newline="", encoding="utf-8-sig")
+    w = csv.writer(f)
+    w.writerow(header)
+    return w.writerow, f.close
+
+def parquet_writer(path, header):
+    import pyarrow as pa  # optional; only needed for .parquet output
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(h, pa.string()) for h in header])
+    writer = pq.ParquetWriter(path, schema)
+    buffer = []
+
+    def flush():
+        if buffer:
+            cols = [[None if r[i] is None else str(r[i]) for r in buffer] for i in range(len(header))]
+            writer.write_table(pa.Table.from_arrays([pa.array(c, pa.string()) for c in cols], schema=schema))
+            buffer.clear()
+
+    def append(row):
+        buffer.append(row)
+        if len(buffer) >= 5000:
+            flush()
+
+    def close():
+        flush()
+        writer.close()
+
+    return append, close
+
+WRITERS = {".xlsx": xlsx_writer, ".csv": csv_writer, ".parquet": parquet_writer}
+
+# Filter Excel rows: stream the workbook chunk by chunk and write matches as they are found
 def filter_excel_by_scopus_ids(excel_path, output_path):
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext not in WRITERS:
+        raise ValueError(f"Unsupported output type {ext!r}; use one of {', '.join(WRITERS)}")
     allowed_ids = get_scopus_ids_from_db()
-    df = pd.read_excel(excel_path)
 
-    def row_has_valid_id(cell):
-        if pd.isna(cell):
-            return False
-        raw_ids = str(cell).replace("\r", "").replace("\n", "").split("|")
-        cleaned_ids = [id.strip() for id in raw_ids if id.strip()]
-        return any(id in allowed_ids for id in cleaned_ids)
+    # the header comes from the sheet, not the first chunk, so a header-only export still gets its file
+    header = [h for h in read_header(excel_path) if h]
+    if AUTHOR_IDS_COLUMN not in header:
+        raise KeyError(f"Column '{AUTHOR_IDS_COLUMN}' not found in {excel_path}")
 
-    filtered_df = df[df['Scopus Author Ids'].apply(row_has_valid_id)]
-    filtered_df.to_excel(output_path, index=False)
-    print(f"✅ Filtered data saved to: {output_path}")
+    append, close = WRITERS[ext](output_path, header)
+    read = kept = 0
+    try:
+        for chunk in iter_chunks(excel_path, header):
+            matches = chunk[has_allowed_id(chunk[AUTHOR_IDS_COLUMN], allowed_ids)]
+            for row in matches.itertuples(index=False, name=None):
+                append(list(row))
+            read += len(chunk)
+            kept += len(matches)
+    finally:
+        close()
+    print(f"✅ Filtered data saved to: {output_path} ({kept} of {read} rows)")
 
-# Usage
-filter_excel_by_scopus_ids('scival.xlsx', 'filtered_output.xlsx')
+# Usage: python scival.py [input.xlsx] [output.xlsx|.csv|.parquet]
+if __name__ == "__main__":
+    filter_excel_by_scopus_ids(sys.argv[1] if len(sys.argv) > 1 else 'scival.xlsx',
+                               sys.argv[2] if len(sys.argv) > 2 else 'filtered_output.xlsx')
@@ -1,16 +1,27 @@
 import sys
-import pandas as pd
 import mysql.connector
 import logging
 import os
 
+from scival_reader import iter_insight_chunks
+from insight_loader import InsightStager, insight_row, ensure_content_hash
+from paper_countries import refresh_paper_countries
+from sdg_mask import refresh_sdg_masks
+from institutions import refresh_paper_institutions
+from country_collaboration import build_collaboration_matrix
+from faculty_attribution import refresh_paper_faculty
+
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 
-if len(sys.argv) < 2:
+# --insert-only keeps the old behaviour of never touching DOIs already in paper_insights
+args = [a for a in sys.argv[1:] if a != "--insert-only"]
+insert_only = "--insert-only" in sys.argv
+
+if not args:
     logging.error("❌ No Excel file provided.")
     sys.exit(1)
 
-excel_file = sys.argv[1]
+excel_file = args[0]
 
 if not os.path.exists(excel_file):
     logging.error(f"❌ File not found: {excel_file}")
@@ -18,84 +29,59 @@ if not os.path.exists(excel_file):
 
 logging.info(f"📂 Processing file: {excel_file}")
 
-# === Read Excel ===
-try:
-    df = pd.read_excel(excel_file)
-except Exception as e:
-    logging.error(f"❌ Failed to read Excel file: {e}")
-    sys.exit(1)
-
-# === Rename columns ===
-df = df.rename(columns={
-    'DOI': 'doi',
-    'Scopus Author ID First Author': 'scopus_author_id_first',
-    'Scopus Author ID Corresponding Author': 'scopus_author_id_corresponding',
-    'Sustainable Development Goals (2023)': 'sustainable_development_goals',
-    'Quacquarelli Symonds (QS) Subject code': 'qs_subject_code',
-    'Quacquarelli Symonds (QS) Subject field name': 'qs_subject_field_name',
-    'All Science Journal Classification (ASJC) code': 'asjc_code',
-    'All Science Journal Classification (ASJC) field name': 'asjc_field_name',
-    'Number of Countries/Regions': 'no_of_countries',
-    'Country/Region': 'country_list',
-    'Number of Institutions': 'no_of_institutions',
-    'Scopus Affiliation names': 'institution_list',
-    'Number of Authors': 'total_authors'
-})
-
-# === Select required columns and clean DOIs ===
-df = df[[
-    'doi', 'scopus_author_id_first', 'scopus_author_id_corresponding',
-    'sustainable_development_goals', 'qs_subject_code', 'qs_subject_field_name',
-    'asjc_code', 'asjc_field_name', 'no_of_countries', 'country_list',
-    'no_of_institutions', 'institution_list', 'total_authors'
-]]
-df['doi'] = df['doi'].astype(str).str.strip()
-
 # === DB Connection ===
 conn = mysql.connector.connect(
     host='localhost',
     user='root',
     password='',
-    database='scopus'
+    database='scopus',
+    allow_local_infile=True
 )
 cursor = conn.cursor()
+ensure_content_hash(cursor)
+conn.commit()
+cursor.close()
+stager = InsightStager(conn)
 
-# === Fetch existing DOIs ===
-cursor.execute("SELECT doi FROM papers")
-valid_dois = set(str(row[0]).strip() for row in cursor.fetchall())
-
-cursor.execute("SELECT doi FROM paper_insights")
-already_inserted_dois = set(str(row[0]).strip() for row in cursor.fetchall())
+# === Stream the workbook into the staging table, one chunk at a time ===
+read_count = 0
+try:
+    for chunk_no, df in enumerate(iter_insight_chunks(excel_file), start=1):
+        stager.add(insight_row(row) for row in df.itertuples(index=False))
+        read_count += len(df)
+        logging.info(f"📄 Chunk {chunk_no}: {read_count} rows read")
+except Exception as e:
+    logging.error(f"❌ Failed to read Excel file: {e}")
+    stager.close()
+    conn.close()
+    sys.exit(1)
 
-# === Prepare Insert Query ===
-insert_query = """
-INSERT INTO paper_insights (
-    doi, scopus_author_id_first, scopus_author_id_corresponding,
-    sustainable_development_goals, qs_subject_code, qs_subject_field_name,
-    asjc_code, asjc_field_name, no_of_countries, country_list,
-    no_of_institutions, institution_list, total_authors
-) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-"""
+# === Filter against papers inside MySQL; insert new DOIs, rewrite changed ones ===
+try:
+    if insert_only:
+        inserted_count, updated_count = stager.insert_new(), 0
+    else:
+        inserted_count, updated_count = stager.upsert()
+except mysql.connector.Error as e:
+    logging.error(f"❌ DB Insert failed: {e}")
+    stager.close()
+    conn.close()
+    sys.exit(1)
 
-# === Insert filtered rows ===
-inserted_count = 0
-for _, row in df.iterrows():
-    doi = str(row['doi']).strip()
-    if doi in valid_dois and doi not in already_inserted_dois and doi not in ("-", ""):
-        try:
-            cursor.execute(insert_query, tuple(row.fillna('').values))
-            inserted_count += 1
-            logging.info(f"✅ Inserted DOI: {doi}")
-        except mysql.connector.IntegrityError as e:
-            if e.errno == 1062:
-                logging.warning(f"⚠️ Duplicate DOI skipped: {doi}")
-                continue
-            else:
-                logging.error(f"❌ DB Insert failed for {doi}: {e}")
+# === Refresh tables derived from paper_insights for the DOIs this upload wrote ===
+try:
+    refresh_paper_countries(conn, stager.changed_dois_sql())
+    refresh_sdg_masks(conn, stager.changed_dois_sql())
+    refresh_paper_institutions(conn, stager.changed_dois_sql())
+    refresh_paper_faculty(conn, stager.changed_dois_sql())
+    if stager.staged:
+        build_collaboration_matrix(conn)
+except mysql.connector.Error as e:
+    logging.error(f"❌ Derived table refresh failed: {e}")
 
 # === Finish ===
-conn.commit()
-cursor.close()
+stager.close()
 conn.close()
 
-logging.info(f"🎉 Done. Inserted {inserted_count} new entries.")
+logging.info(f"🎉 Done. Read {read_count} rows, staged {stager.staged}, inserted {inserted_count} new "
+             f"and updated {updated_count} changed entries.")
@@ -0,0 +1,94 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+CHUNK_ROWS = 5000  # rows per DataFrame handed to the caller
+
+# SciVal export header → paper_insights column
+SCIVAL_COLUMNS = {
+    'DOI': 'doi',
+    'Scopus Author ID First Author': 'scopus_author_id_first',
+    'Scopus Author ID Corresponding Author': 'scopus_author_id_corresponding',
+    'Sustainable Development Goals (2023)': 'sustainable_development_goals',
+    'Quacquarelli Symonds (QS) Subject code': 'qs_subject_code',
+    'Quacquarelli Symonds (QS) Subject field name': 'qs_subject_field_name',
+    'All Science Journal Classification (ASJC) code': 'asjc_code',
+    'All Science Journal Classification (ASJC) field name': 'asjc_field_name',
+    'Number of Countries/Regions': 'no_of_countries',
+    'Country/Region': 'country_list',
+    'Number of Institutions': 'no_of_institutions',
+    'Scopus Affiliation names': 'institution_list',
+    'Number of Authors': 'total_authors',
+    'Scopus Author Ids': 'scopus_author_ids',
+}
+INSIGHT_COLUMNS = list(SCIVAL_COLUMNS.values())
+# older exports were made without these; they are read as empty instead of failing the upload
+OPTIONAL_SCIVAL_COLUMNS = {'Scopus Author Ids'}
+
+
+def read_header(path, sheet=None):
+    """Stripped header row of one worksheet, without reading the rows below it."""
+    with open(path, "rb") as f:
+        wb = load_workbook(f, read_only=True, data_only=True)
+        try:
+            ws = wb[sheet] if sheet else wb.active
+            first = next(ws.iter_rows(values_only=True), ())
+            return [str(h).strip() if h is not None else "" for h in first]
+        finally:
+            wb.close()
+
+
+def iter_header_and_rows(path, sheet=None):
+    """(header, row iterator) over one worksheet, read in openpyxl's streaming mode."""
+    # a file object, not the path: openpyxl rejects paths without an .xlsx extension,
+    # and multer stores admin uploads under extensionless names
+    f = open(path, "rb")
+    try:
+        wb = load_workbook(f, read_only=True, data_only=True)
+        ws = wb[sheet] if sheet else wb.active
+        rows = ws.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+    except Exception:
+        f.close()
+        raise
+
+    def body():
+        try:
+            yield from rows
+        finally:
+            wb.close()
+            f.close()
+
+    return header, body()
+
+
+def iter_chunks(path, columns=None, chunk_size=CHUNK_ROWS, sheet=None, optional=()):
+    """
+    Read a workbook as DataFrames of at most chunk_size rows, keeping only the given
+    header columns (those in optional may be absent and come back as None).
+    Memory is bounded by one chunk, not by the size of the export.
+    """
+    header, rows = iter_header_and_rows(path, sheet)
+    wanted = list(columns) if columns is not None else [h for h in header if h]
+    missing = [c for c in wanted if c not in header and c not in optional]
+    if missing:
+        raise KeyError(f"Columns not found in {path}: {missing}")
+    idx = [header.index(c) if c in header else None for c in wanted]
+
+    chunk = []
+    for row in rows:
+        if not any(v is not None for v in row):
+            continue
+        chunk.append([row[i] if i is not None and i < len(row) else None for i in idx])
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame(chunk, columns=wanted, dtype=object)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk, columns=wanted, dtype=object)
+
+
+def iter_insight_chunks(path, chunk_size=CHUNK_ROWS):
+    """SciVal export → DataFrames with INSIGHT_COLUMNS and stripped DOIs."""
+    for df in iter_chunks(path, SCIVAL_COLUMNS, chunk_size, optional=OPTIONAL_SCIVAL_COLUMNS):
+        df = df.rename(columns=SCIVAL_COLUMNS)
+        df['doi'] = df['doi'].astype(str).str.strip()
+        yield df
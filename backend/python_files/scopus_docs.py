@@ -0,0 +1,93 @@
+import json
+from urllib.parse import urlencode
+
+from issn_lookup import clean_issn
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # plain json still works, just slower
+    _loads = json.loads
+
+SEARCH_URL = "https://api.elsevier.com/content/search/scopus"
+PAGE_SIZE = 25  # max page size for view=COMPLETE
+
+# Only the fields the sync actually stores (ISSNs feed the quartile jobs)
+DOC_FIELDS = (
+    "prism:doi",
+    "dc:title",
+    "prism:coverDate",
+    "prism:aggregationType",
+    "prism:publicationName",
+    "prism:issn",
+    "prism:eIssn",
+    "author",
+    "affiliation",
+)
+
+
+class ScopusDoc:
+    """Compact typed view of one Scopus search entry."""
+
+    __slots__ = ("doi", "title", "cover_date", "aggregation_type",
+                 "publication_name", "issn", "eissn", "authors", "affiliations")
+
+    def __init__(self, doi, title, cover_date, aggregation_type, publication_name,
+                 issn, eissn, authors, affiliations):
+        self.doi = doi
+        self.title = title
+        self.cover_date = cover_date
+        self.aggregation_type = aggregation_type
+        self.publication_name = publication_name
+        self.issn = issn
+        self.eissn = eissn
+        self.authors = authors
+        self.affiliations = affiliations
+
+    @classmethod
+    def from_entry(cls, entry):
+        return cls(
+            entry.get("prism:doi"),
+            entry.get("dc:title"),
+            entry.get("prism:coverDate"),
+            entry.get("prism:aggregationType"),
+            entry.get("prism:publicationName"),
+            clean_issn(entry.get("prism:issn")),
+            clean_issn(entry.get("prism:eIssn")),
+            tuple(a.get("authname", "") for a in entry.get("author", ())),
+            tuple(a.get("affilname", "") for a in entry.get("affiliation", ())),
+        )
+
+
+def search_url(scopus_id, start=0, fields=DOC_FIELDS):
+    return SEARCH_URL + "?" + urlencode({
+        "query": f"AU-ID({scopus_id})",
+        "view": "COMPLETE",
+        "field": ",".join(fields),
+        "start": start,
+        "count": PAGE_SIZE,
+    })
+
+
+def decode_page(body):
+    """Decode one search-results payload into (total_results, [ScopusDoc])."""
+    results = _loads(body).get("search-results", {})
+    total = int(results.get("opensearch:totalResults") or 0)
+    entries = results.get("entry", [])
+    # an empty result set comes back as a single entry carrying only "error"
+    docs = [ScopusDoc.from_entry(e) for e in entries if "error" not in e]
+    return total, docs
+
+
+def fetch_author_docs(client, scopus_id):
+    """All documents for one author as ScopusDoc records, fetched with field projection."""
+    body = client.exec_request_bytes(search_url(scopus_id))
+    total, docs = decode_page(body)
+    start = len(docs)
+    while start < total:
+        _, page = decode_page(client.exec_request_bytes(search_url(scopus_id, start)))
+        if not page:
+            break
+        docs.extend(page)
+        start += len(page)
+    return docs
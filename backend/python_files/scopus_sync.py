@@ -1,12 +1,21 @@
 import sys
 import io
 import mysql.connector
-from elsapy.elsclient import ElsClient
+import requests
 from elsapy.elsprofile import ElsAuthor
 import json
 import os
 from datetime import datetime
 
+from els_client import DeadlineElsClient
+from request_layer import DeadlineSession
+from issn_lookup import ensure_issn_columns
+from journals import ensure_journal_tables, JournalResolver
+from author_aliases import (ensure_alias_table, load_aliases, record_aliases, resolve,
+                            fetch_docs_resolving_aliases, consolidation_report)
+from sync_pipeline import SyncPipeline, FETCH_WORKERS
+from faculty_attribution import refresh_paper_faculty
+
 # ---------------- UTF-8 fix for Windows console ----------------
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 # ---------------------------------------------------------------
@@ -65,7 +74,8 @@ def connect_to_database():
 
 def initialize_elsclient(config):
     try:
-        return ElsClient(config['apikey'])
+        http = DeadlineSession(hedge=config.get('hedge_requests', False))
+        return DeadlineElsClient(config['apikey'], http=http)
     except KeyError:
         print("API key not found in config file.")
         exit(1)
@@ -118,28 +128,47 @@ def get_all_faculty_scopus_ids(cursor):
             faculty_map[faculty_id]['all_ids'].append(additional_id)
     return faculty_map
 
-def insert_user(cursor, conn, scopus_id, name, docs_count):
-    cursor.execute("""
-        INSERT INTO users (scopus_id, name, docs_count, access)
-        VALUES (%s, %s, %s, 2)
-        ON DUPLICATE KEY UPDATE name = VALUES(name), docs_count = VALUES(docs_count)
-    """, (scopus_id, name, docs_count))
-    conn.commit()
+INSERT_USER_SQL = """
+    INSERT INTO users (scopus_id, name, docs_count, access)
+    VALUES (%s, %s, %s, 2)
+    ON DUPLICATE KEY UPDATE name = VALUES(name), docs_count = VALUES(docs_count)
+"""
 
-def insert_paper(cursor, conn, scopus_id, doi, title, pub_type, pub_name, date, authors, affiliations):
+INSERT_PAPER_SQL = """
+    INSERT INTO papers (scopus_id, doi, title, type, publication_name, date, issn, eissn,
+                        author1, author2, author3, author4, author5, author6,
+                        affiliation1, affiliation2, affiliation3, journal_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s,
+            %s, %s, %s, %s, %s, %s,
+            %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE title = VALUES(title), type = VALUES(type),
+                            publication_name = VALUES(publication_name), date = VALUES(date),
+                            issn = COALESCE(VALUES(issn), issn), eissn = COALESCE(VALUES(eissn), eissn),
+                            journal_id = COALESCE(VALUES(journal_id), journal_id)
+"""
+
+def paper_row(scopus_id, doc):
+    """Turn one ScopusDoc into an INSERT_PAPER_SQL row."""
+    authors = [a or "Unknown Author" for a in doc.authors[:6]]
+    affiliations = [a or "Unknown Affiliation" for a in doc.affiliations[:3]]
     authors += [""] * (6 - len(authors))
     affiliations += [""] * (3 - len(affiliations))
-    cursor.execute("""
-        INSERT INTO papers (scopus_id, doi, title, type, publication_name, date,
-                            author1, author2, author3, author4, author5, author6,
-                            affiliation1, affiliation2, affiliation3)
-        VALUES (%s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s, %s,
-                %s, %s, %s)
-        ON DUPLICATE KEY UPDATE title = VALUES(title), type = VALUES(type),
-                                publication_name = VALUES(publication_name), date = VALUES(date)
-    """, (scopus_id, doi if doi else None, title, pub_type, pub_name, date,
-          *authors[:6], *affiliations[:3]))
+    return (scopus_id, doc.doi if doc.doi else None,
+            doc.title or "Unknown Title",
+            (doc.aggregation_type or "journal").lower(),
+            doc.publication_name or "Unknown Journal",
+            doc.cover_date or "0000-00-00",
+            doc.issn, doc.eissn,
+            *authors, *affiliations)
+
+def write_rows(cursor, conn, rows, journals):
+    """Write a mixed batch of ("user", row) / ("paper", row) items and commit once."""
+    users = [row for kind, row in rows if kind == "user"]
+    papers = [row + (journals.resolve(row[4], row[6], row[7]),) for kind, row in rows if kind == "paper"]
+    if users:
+        cursor.executemany(INSERT_USER_SQL, users)
+    if papers:
+        cursor.executemany(INSERT_PAPER_SQL, papers)
     conn.commit()
 
 # ---------- MAIN FETCH FUNCTION ----------
@@ -157,65 +186,120 @@ def fetch_new_papers():
     existing_authors = get_existing_authors(cursor)
     faculty_map = get_all_faculty_scopus_ids(cursor)
 
-    total_faculty = len(faculty_map)
-    total_new_papers = 0
-    total_updated_authors = 0
+    ensure_issn_columns(cursor)
+    ensure_journal_tables(cursor)
+    ensure_alias_table(cursor)
+    aliases = load_aliases(cursor)
+    new_aliases = []
+
     authors_with_new_papers = set()
+    counts = {"new_papers": 0, "updated_authors": 0}
 
-    for idx, (faculty_id, ids_dict) in enumerate(faculty_map.items(), start=1):
+    # fetch stage: profile + document lists for every Scopus ID of one faculty
+    def fetch_faculty(job):
+        faculty_id, ids_dict = job
         main_id = ids_dict['main']
-        scopus_ids_to_check = ids_dict['all_ids']
-        progress = idx / total_faculty
-        log_progress(f"Processing faculty {idx}/{total_faculty} ({faculty_id})", progress)
 
-        # Fetch profile using main_id
-        my_auth = ElsAuthor(uri=f'https://api.elsevier.com/content/author/author_id/{main_id}')
+        my_auth = ElsAuthor(uri=f'https://api.elsevier.com/content/author/author_id/{resolve(main_id, aliases)}')
         if not my_auth.read(client):
-            log_progress(f"Failed to read author data for {faculty_id}", progress)
-            continue
+            log_progress(f"Failed to read author data for {faculty_id}")
+            return None
 
-        author_name = my_auth.full_name
-        docs_count = int(my_auth.data.get('coredata', {}).get('document-count', 0))
+        doc_lists = []
+        found_aliases = []
+        for scopus_id in ids_dict['all_ids']:
+            try:
+                docs, alias = fetch_docs_resolving_aliases(client, scopus_id, aliases)
+            except requests.RequestException as e:
+                log_progress(f"Failed to fetch documents for {scopus_id}: {e}")
+                continue
+            doc_lists.append(docs)
+            if alias:
+                found_aliases.append(alias)
 
-        # Insert/update main user
-        insert_user(cursor, conn, main_id, author_name, docs_count)
-        total_updated_authors += 1
+        return {
+            "name": my_auth.full_name,
+            "docs_count": int(my_auth.data.get('coredata', {}).get('document-count', 0)),
+            "doc_lists": doc_lists,
+            "aliases": found_aliases
+        }
 
-        # For each Scopus ID of this faculty (main + additional)
-        new_papers_for_author = 0
-        for scopus_id in scopus_ids_to_check:
-            temp_auth = ElsAuthor(uri=f'https://api.elsevier.com/content/author/author_id/{scopus_id}')
-            if not temp_auth.read_docs(client):
-                continue
+    # transform stage: single thread, so existing_papers and counters need no locking
+    def transform_faculty(job, data):
+        _, ids_dict = job
+        main_id = ids_dict['main']
 
-            for doc in temp_auth.doc_list:
-                doi = doc.get("prism:doi")
-                is_new_paper = (
-                    main_id not in existing_papers or 
-                    (doi and doi not in existing_papers.get(main_id, set()))
-                )
-                if is_new_paper:
-                    title = doc.get("dc:title", "Unknown Title")
-                    pub_type = doc.get("prism:aggregationType", "journal").lower()
-                    pub_name = doc.get("prism:publicationName", "Unknown Journal")
-                    date = doc.get("prism:coverDate", "0000-00-00")
-                    authors = [a.get("authname", "Unknown Author") for a in doc.get("author", [])[:6]]
-                    affiliations = [a.get("affilname", "Unknown Affiliation") for a in doc.get("affiliation", [])[:3]]
-
-                    insert_paper(cursor, conn, main_id, doi, title, pub_type, pub_name, date, authors, affiliations)
-                    new_papers_for_author += 1
-                    total_new_papers += 1
-                    log_progress(f"Added new paper: {title}", progress)
+        for alias in data["aliases"]:
+            new_aliases.append(alias)
+            log_progress(f"Scopus ID {alias[0]} was merged into {alias[1]}")
+
+        yield ("user", (main_id, data["name"], data["docs_count"]))
+        counts["updated_authors"] += 1
+
+        new_papers_for_author = 0
+        known_author = main_id in existing_papers
+        known = existing_papers.setdefault(main_id, set())
+        for doc_list in data["doc_lists"]:
+            for doc in doc_list:
+                doi = doc.doi
+                if known_author and (not doi or doi in known):
+                    continue
+                if doi:
+                    known.add(doi)
+                yield ("paper", paper_row(main_id, doc))
+                new_papers_for_author += 1
+                counts["new_papers"] += 1
 
         if new_papers_for_author > 0:
-            authors_with_new_papers.add(author_name)
+            authors_with_new_papers.add(data["name"])
+
+    # write stage: single thread with its own connection
+    write_conn = connect_to_database()
+    write_cursor = write_conn.cursor()
+    journals = JournalResolver(write_conn)
+
+    pipeline = SyncPipeline(
+        fetch_faculty,
+        transform_faculty,
+        lambda rows: write_rows(write_cursor, write_conn, rows, journals),
+        progress_fn=lambda done, total: log_progress(f"Processed faculty {done}/{total}", done / total),
+        report_fn=lambda stats: log_progress("Sync pipeline stats", None, stats),
+        fetch_workers=config.get('fetch_workers', FETCH_WORKERS)
+    )
+    try:
+        try:
+            pipeline_stats = pipeline.run(faculty_map.items())
+        finally:
+            # a failed write stops the pipeline; still keep the journal counts and merged IDs seen so far
+            journals.close()
+            write_cursor.close()
+            write_conn.close()
+            record_aliases(cursor, conn, new_aliases)
+    except Exception as e:
+        log_progress(f"Sync stopped: {e}")
+        client.http.close()
+        cursor.close()
+        conn.close()
+        raise
+
+    to_consolidate = consolidation_report(cursor)
 
-    summary_msg = f"Update complete: {total_new_papers} new papers, {len(authors_with_new_papers)} authors updated."
+    summary_msg = f"Update complete: {counts['new_papers']} new papers, {len(authors_with_new_papers)} authors updated."
     log_progress(summary_msg, 1, {
-        "total_new_papers": total_new_papers,
+        "total_new_papers": counts["new_papers"],
         "authors_with_new_papers": list(authors_with_new_papers),
-        "authors_updated": total_updated_authors
+        "authors_updated": counts["updated_authors"],
+        "pipeline": pipeline_stats,
+        "consolidate_scopus_ids": to_consolidate,
+        "http": client.http.stats()
     })
+    client.http.close()
+
+    # new papers (and any newly mapped IDs) get their faculty attribution now, not at the next SciVal upload
+    try:
+        refresh_paper_faculty(conn)
+    except mysql.connector.Error as e:
+        log_progress(f"Faculty attribution refresh failed: {e}")
 
     cursor.close()
     conn.close()
@@ -1,14 +1,29 @@
-import requests
-import mysql.connector
+import hashlib
+import json
+import os
 import re
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+import mysql.connector
+
+from sdg_mask import ensure_sdg_mask_column, sdg_mask
 
 # ── CONFIG ──
 dry_run   = False                          # False → actually write back to DB
-HF_TOKEN  = "token"           # ← your Hugging Face token
+local     = "--local" in sys.argv          # score with sdg_local_model instead of the HF endpoint
+HF_TOKEN  = os.environ.get("HF_TOKEN", "token")   # ← your Hugging Face token
 API_URL   = "https://api-inference.huggingface.co/models/facebook/bart-large-mnli"
 HEADERS   = {"Authorization": f"Bearer {HF_TOKEN}"}
 
+HF_BATCH      = 8      # texts per inference request
+HF_CONCURRENCY = 4     # requests in flight
+MAX_RETRIES   = 5      # per request, on 429 / 5xx / connection errors
+BACKOFF_BASE  = 2.0    # seconds, doubled on every retry
+WRITE_BATCH   = 200    # classified papers per DB write
+
 # 1️⃣ zero‑shot candidate labels
 sdg_labels = [f"SDG {i}" for i in range(1, 18)]
 
@@ -32,79 +47,202 @@ def top_n_sdg_numbers(labels, scores, n=1):
             nums.append(m.group(1))
     return ",".join(sorted(set(nums), key=int))
 
-# 4️⃣ zero‑shot call
-def query_zero_shot(text):
+# 4️⃣ zero‑shot call: one request for a batch of texts, retried with exponential backoff
+session = requests.Session()
+session.headers.update(HEADERS)
+
+def query_zero_shot_batch(texts):
     payload = {
-        "inputs": text,
+        "inputs": texts,
         "parameters": {
             "candidate_labels": sdg_labels,
             "multi_label": True
         }
     }
-    resp = requests.post(API_URL, headers=HEADERS, json=payload)
-    resp.raise_for_status()
-    data = resp.json()
-    return data["labels"], data["scores"]
-
-# ── MAIN ──
+    for attempt in range(MAX_RETRIES):
+        wait = None
+        try:
+            resp = session.post(API_URL, json=payload, timeout=120)
+            if resp.status_code == 429 or resp.status_code >= 500:
+                # 503 while the model is loading carries an estimated_time
+                wait = resp.headers.get("Retry-After")
+                if wait is None and resp.status_code == 503:
+                    try:
+                        wait = resp.json().get("estimated_time")
+                    except ValueError:
+                        pass
+                raise requests.exceptions.RetryError(f"HTTP {resp.status_code}", response=resp)
+            resp.raise_for_status()
+            data = resp.json()
+            data = data if isinstance(data, list) else [data]
+            return [(d["labels"], d["scores"]) for d in data]
+        except (requests.exceptions.RetryError, requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout) as e:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            delay = float(wait) if wait else BACKOFF_BASE * 2 ** attempt
+            print(f"[…] {e}; retrying in {delay:.0f}s ({attempt + 1}/{MAX_RETRIES})")
+            time.sleep(delay)
 
-# Connect to MySQL
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="",
-    database="scopus"
+def query_zero_shot(text):
+    return query_zero_shot_batch([text])[0]
+
+# 5️⃣ persistent cache: text hash → raw labels/scores, so reruns never reclassify the same text
+CREATE_CACHE_TABLE = """
+CREATE TABLE IF NOT EXISTS sdg_zero_shot_cache (
+    text_hash CHAR(64) PRIMARY KEY,
+    labels TEXT NOT NULL,
+    scores TEXT NOT NULL,
+    classified_at DATETIME NOT NULL
 )
-cursor = conn.cursor(dictionary=True)
-
-# Fetch papers with missing SDGs
-cursor.execute("""
-    SELECT p.doi, p.title, i.qs_subject_field_name, i.asjc_field_name
-    FROM papers p
-    JOIN paper_insights i ON p.doi = i.doi
-    WHERE TRIM(IFNULL(i.sustainable_development_goals, '')) IN ('', '-', 'UNSPECIFIED')
-""")
-papers = cursor.fetchall()
-
-for paper in papers:
-    doi  = paper['doi']
-    text = (
+"""
+
+def paper_text(paper):
+    return (
         f"Title: {paper['title']}\n"
         f"QS Subject: {paper['qs_subject_field_name']}\n"
         f"ASJC Field: {paper['asjc_field_name']}"
     )
-    try:
-        labels, scores = query_zero_shot(text)
-
-        # 1) try threshold-based extraction
-        sdg_nums = extract_sdg_numbers(labels, scores, threshold=0.3)
-        # 2) if none, fallback to top‑1
-        if not sdg_nums:
-            sdg_nums = top_n_sdg_numbers(labels, scores, n=1)
-
-        # 3) format for DB: "SDG 3| SDG 9| SDG 13"
-        sdg_db = ""
-        if sdg_nums:
-            sdg_db = "| ".join(f"SDG {n}" for n in sdg_nums.split(","))
-
-        # 4) low‑confidence flag (optional)
-        needs_review = max(scores) < 0.4
 
-        print(f"[✓] {doi} → {sdg_db} {'(REVIEW)' if needs_review else ''}")
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def store_cache(cursor, results):
+    cursor.executemany("""
+        INSERT INTO sdg_zero_shot_cache (text_hash, labels, scores, classified_at)
+        VALUES (%s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE labels = VALUES(labels), scores = VALUES(scores), classified_at = NOW()
+    """, [(h, json.dumps(labels), json.dumps(scores)) for h, (labels, scores) in results.items()])
+
+# 6️⃣ labels/scores → "SDG 3| SDG 9| SDG 13"
+def sdg_string(labels, scores):
+    # 1) try threshold-based extraction
+    sdg_nums = extract_sdg_numbers(labels, scores, threshold=0.3)
+    # 2) if none, fallback to top‑1
+    if not sdg_nums:
+        sdg_nums = top_n_sdg_numbers(labels, scores, n=1)
+    return "| ".join(f"SDG {n}" for n in sdg_nums.split(",")) if sdg_nums else ""
+
+# 7️⃣ batched write-back through a temporary table
+def write_sdgs(conn, rows):
+    if dry_run or not rows:
+        return
+    cursor = conn.cursor()
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_sdg_update;")
+    cursor.execute("""
+        CREATE TEMPORARY TABLE tmp_sdg_update (
+            doi VARCHAR(255) PRIMARY KEY,
+            sustainable_development_goals TEXT,
+            sdg_mask INT UNSIGNED
+        )
+    """)
+    cursor.executemany("INSERT IGNORE INTO tmp_sdg_update VALUES (%s, %s, %s)",
+                       [(doi, sdg_db, sdg_mask(sdg_db)) for doi, sdg_db in rows])
+    cursor.execute("""
+        UPDATE paper_insights i
+        JOIN tmp_sdg_update t ON t.doi = i.doi
+        SET i.sustainable_development_goals = t.sustainable_development_goals, i.sdg_mask = t.sdg_mask
+    """)
+    conn.commit()
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_sdg_update;")
+    cursor.close()
 
-        # 5) write back if not dry run and we have something
-        if not dry_run and sdg_db:
-            cursor.execute("""
-                UPDATE paper_insights
-                SET sustainable_development_goals = %s
-                WHERE doi = %s
-            """, (sdg_db, doi))
-            conn.commit()
-
-        time.sleep(1.0)  # avoid rate limits
-
-    except Exception as e:
-        print(f"[!] Error with DOI {doi}: {e}")
-
-cursor.close()
-conn.close()
+# ── MAIN ──
+if __name__ == "__main__":
+    # Connect to MySQL
+    conn = mysql.connector.connect(
+        host="localhost",
+        user="root",
+        password="",
+        database="scopus"
+    )
+    cursor = conn.cursor(dictionary=True)
+    ensure_sdg_mask_column(cursor)
+    cursor.execute(CREATE_CACHE_TABLE)
+    conn.commit()
+
+    if local:
+        from sdg_local_model import MODEL_PATH, classify_unlabeled, load_model, train
+        try:
+            model = load_model() if os.path.exists(MODEL_PATH) else train(conn)[0]
+        except ValueError as e:
+            # too few SciVal-labelled papers to train on yet
+            print(f"[!] Local SDG model unavailable: {e}; using the Hugging Face endpoint instead")
+            model = None
+        if model is not None:
+            results = classify_unlabeled(conn, model)
+            for i in range(0, len(results), WRITE_BATCH):
+                write_sdgs(conn, results[i:i + WRITE_BATCH])
+            print(f"[i] Classified {len(results)} papers with the local model")
+            cursor.close()
+            conn.close()
+            sys.exit(0)
+
+    # Fetch papers with missing SDGs
+    cursor.execute("""
+        SELECT DISTINCT p.doi, p.title, i.qs_subject_field_name, i.asjc_field_name
+        FROM papers p
+        JOIN paper_insights i ON p.doi = i.doi
+        WHERE TRIM(IFNULL(i.sustainable_development_goals, '')) IN ('', '-', 'UNSPECIFIED')
+    """)
+    papers = {}
+    for paper in cursor.fetchall():
+        papers.setdefault(paper['doi'], paper_text(paper))
+    hashes = {doi: text_hash(text) for doi, text in papers.items()}
+
+    cursor.execute("SELECT text_hash, labels, scores FROM sdg_zero_shot_cache")
+    cache = {h: (json.loads(labels), json.loads(scores)) for h, labels, scores in
+             ((r['text_hash'], r['labels'], r['scores']) for r in cursor.fetchall())}
+    cursor.close()
+
+    # one request per batch of distinct uncached texts
+    dois_by_hash = {}
+    for doi, h in hashes.items():
+        dois_by_hash.setdefault(h, []).append(doi)
+    todo = [(h, papers[dois[0]]) for h, dois in dois_by_hash.items() if h not in cache]
+    batches = [todo[i:i + HF_BATCH] for i in range(0, len(todo), HF_BATCH)]
+    print(f"[i] {len(papers)} papers without SDGs, {len(dois_by_hash) - len(todo)} distinct texts cached, "
+          f"{len(todo)} to classify in {len(batches)} requests")
+
+    pending_writes = []
+    classified = 0
+
+    def record(text_hashes, force=False):
+        """Queue the SDGs of every paper with these (now classified) texts; write WRITE_BATCH at a time."""
+        global classified
+        for h in text_hashes:
+            labels, scores = cache[h]
+            sdg_db = sdg_string(labels, scores)
+            # low‑confidence flag (optional)
+            needs_review = max(scores) < 0.4
+            for doi in dois_by_hash[h]:
+                print(f"[✓] {doi} → {sdg_db} {'(REVIEW)' if needs_review else ''}")
+                classified += 1
+                if sdg_db:
+                    pending_writes.append((doi, sdg_db))
+        if pending_writes and (force or len(pending_writes) >= WRITE_BATCH):
+            write_sdgs(conn, pending_writes)
+            pending_writes.clear()
+
+    record([h for h in dois_by_hash if h in cache])
+    with ThreadPoolExecutor(max_workers=HF_CONCURRENCY) as pool:
+        futures = {pool.submit(query_zero_shot_batch, [text for _, text in batch]): batch for batch in batches}
+        for fut in as_completed(futures):
+            batch = futures[fut]
+            try:
+                fresh = {h: result for (h, _), result in zip(batch, fut.result())}
+            except Exception as e:
+                print(f"[!] Error with batch of {len(batch)} papers: {e}")
+                continue
+            cache.update(fresh)
+            if not dry_run:
+                c = conn.cursor()
+                store_cache(c, fresh)
+                conn.commit()
+                c.close()
+            record(fresh)
+    record([], force=True)
+
+    print(f"[i] Classified {classified} of {len(papers)} papers")
+    session.close()
+    conn.close()
@@ -0,0 +1,142 @@
+import logging
+import sys
+
+import joblib
+import mysql.connector
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score, hamming_loss
+from sklearn.model_selection import train_test_split
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.pipeline import make_pipeline
+
+from insight_loader import content_hash_sql, ensure_content_hash
+from sdg_mask import SDG_COUNT, ensure_sdg_mask_column, mask_to_sdgs
+
+# Local multi-label SDG model: TF-IDF over title + QS subject + ASJC field, one logistic
+# regression per SDG, trained on the rows whose SDGs still come straight from SciVal.
+MODEL_PATH = "sdg_model.joblib"
+THRESHOLD = 0.5      # per-SDG probability needed to assign it
+TEST_SIZE = 0.2      # held-out share for the accuracy report
+SEED = 42
+BITS = 1 << np.arange(SDG_COUNT, dtype=np.int64)
+
+
+def paper_text(title, qs_subject, asjc_field):
+    return f"{title or ''} {qs_subject or ''} {asjc_field or ''}"
+
+
+def masks_to_matrix(masks):
+    """sdg_mask values → (n, 17) 0/1 label matrix."""
+    return ((np.asarray(masks, dtype=np.int64)[:, None] & BITS) != 0).astype(np.int8)
+
+
+def matrix_to_masks(labels):
+    return (np.asarray(labels, dtype=np.int64) * BITS).sum(axis=1)
+
+
+def load_labeled(cursor):
+    """(texts, sdg masks) for papers whose paper_insights row is unchanged since the SciVal upload."""
+    cursor.execute(f"""
+        SELECT p.doi, MIN(p.title), pi.qs_subject_field_name, pi.asjc_field_name, pi.sdg_mask
+        FROM paper_insights pi
+        JOIN papers p ON p.doi = pi.doi
+        WHERE pi.sdg_mask <> 0 AND pi.content_hash = {content_hash_sql('pi')}
+        GROUP BY p.doi, pi.qs_subject_field_name, pi.asjc_field_name, pi.sdg_mask
+    """)
+    rows = cursor.fetchall()
+    return [paper_text(*r[1:4]) for r in rows], np.array([r[4] for r in rows], dtype=np.int64)
+
+
+def load_unlabeled(cursor):
+    """(dois, texts) for papers SciVal gave no SDG."""
+    cursor.execute("""
+        SELECT p.doi, MIN(p.title), pi.qs_subject_field_name, pi.asjc_field_name
+        FROM paper_insights pi
+        JOIN papers p ON p.doi = pi.doi
+        WHERE TRIM(IFNULL(pi.sustainable_development_goals, '')) IN ('', '-', 'UNSPECIFIED')
+        GROUP BY p.doi, pi.qs_subject_field_name, pi.asjc_field_name
+    """)
+    rows = cursor.fetchall()
+    return [r[0] for r in rows], [paper_text(*r[1:4]) for r in rows]
+
+
+# ——— MODEL ———
+def new_model():
+    return make_pipeline(
+        TfidfVectorizer(ngram_range=(1, 2), min_df=2, max_features=200_000, sublinear_tf=True,
+                        strip_accents="unicode"),
+        OneVsRestClassifier(LogisticRegression(solver="liblinear", C=4.0, class_weight="balanced"), n_jobs=-1),
+    )
+
+
+def predict_labels(model, texts, threshold=THRESHOLD):
+    """(n, 17) 0/1 labels: every SDG at or above threshold, else the single most likely one."""
+    proba = model.predict_proba(texts)
+    labels = (proba >= threshold).astype(np.int8)
+    empty = labels.sum(axis=1) == 0
+    labels[empty, proba[empty].argmax(axis=1)] = 1
+    return labels
+
+
+def evaluate(y_true, y_pred):
+    present = np.flatnonzero(y_true.sum(axis=0))  # macro F1 over the SDGs the test split contains
+    return {
+        "subset_accuracy": float((y_true == y_pred).all(axis=1).mean()),
+        "any_match": float(((y_true & y_pred).sum(axis=1) > 0).mean()),
+        "micro_f1": float(f1_score(y_true, y_pred, average="micro", zero_division=0)),
+        "macro_f1": float(f1_score(y_true, y_pred, labels=present, average="macro", zero_division=0)),
+        "hamming_loss": float(hamming_loss(y_true, y_pred)),
+    }
+
+
+def train(cnx, path=MODEL_PATH):
+    """Fit on a train split, report held-out metrics, refit on everything and save to path."""
+    cursor = cnx.cursor()
+    ensure_sdg_mask_column(cursor)
+    ensure_content_hash(cursor)
+    cnx.commit()
+    texts, masks = load_labeled(cursor)
+    cursor.close()
+    if len(texts) < 50:
+        raise ValueError(f"Only {len(texts)} SciVal-labelled papers; too few to train on")
+    y = masks_to_matrix(masks)
+
+    train_x, test_x, train_y, test_y = train_test_split(texts, y, test_size=TEST_SIZE, random_state=SEED)
+    model = new_model().fit(train_x, train_y)
+    metrics = evaluate(test_y, predict_labels(model, test_x))
+    logging.info(f"📊 Held-out ({len(test_x)} papers): " + ", ".join(f"{k}={v:.3f}" for k, v in metrics.items()))
+
+    model = new_model().fit(texts, y)
+    joblib.dump({"model": model, "metrics": metrics, "trained_on": len(texts)}, path)
+    logging.info(f"💾 Saved SDG model trained on {len(texts)} papers to {path}")
+    return model, metrics
+
+
+def load_model(path=MODEL_PATH):
+    return joblib.load(path)["model"]
+
+
+def classify_unlabeled(cnx, model):
+    """[(doi, 'SDG 3| SDG 9')] for every paper without SDGs, scored in one batch."""
+    cursor = cnx.cursor()
+    dois, texts = load_unlabeled(cursor)
+    cursor.close()
+    if not dois:
+        return []
+    masks = matrix_to_masks(predict_labels(model, texts))
+    return [(doi, "| ".join(f"SDG {k}" for k in mask_to_sdgs(mask))) for doi, mask in zip(dois, masks.tolist())]
+
+
+# ——— TRAIN / REPORT ———
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    conn = mysql.connector.connect(host='localhost', user='root', password='', database='scopus')
+    try:
+        train(conn, sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH)
+    except (mysql.connector.Error, ValueError) as e:
+        logging.error(f"❌ SDG model training failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
@@ -0,0 +1,61 @@
+import logging
+import re
+
+# paper_insights.sdg_mask: bit k-1 is set when the paper is tagged with SDG k (k = 1..17),
+# mirroring the "SDG 3| SDG 9| SDG 13" string in sustainable_development_goals.
+SDG_COUNT = 17
+BATCH = 5000
+
+
+def parse_sdgs(text):
+    """'SDG 3| SDG 9| SDG 13' → [3, 9, 13]; '-', blanks and out-of-range numbers are ignored."""
+    if not text:
+        return []
+    found = set()
+    for part in re.split(r"[|,]", str(text)):
+        m = re.search(r"\d+", part)
+        if m and 1 <= int(m.group()) <= SDG_COUNT:
+            found.add(int(m.group()))
+    return sorted(found)
+
+
+def sdg_mask(text):
+    mask = 0
+    for k in parse_sdgs(text):
+        mask |= 1 << (k - 1)
+    return mask
+
+
+def mask_to_sdgs(mask):
+    return [k for k in range(1, SDG_COUNT + 1) if mask & (1 << (k - 1))]
+
+
+def ensure_sdg_mask_column(cursor):
+    cursor.execute("SHOW COLUMNS FROM paper_insights LIKE 'sdg_mask';")
+    if not cursor.fetchone():
+        cursor.execute("ALTER TABLE paper_insights ADD COLUMN sdg_mask INT UNSIGNED NOT NULL DEFAULT 0;")
+        logging.info("Added `sdg_mask` column to paper_insights table.")
+
+
+def refresh_sdg_masks(cnx, doi_subquery=None):
+    """Recompute sdg_mask for the DOIs returned by doi_subquery (all rows when None)."""
+    cursor = cnx.cursor()
+    ensure_sdg_mask_column(cursor)
+    scope = f"WHERE pi.doi IN ({doi_subquery})" if doi_subquery else ""
+    cursor.execute(f"SELECT pi.doi, pi.sustainable_development_goals, pi.sdg_mask FROM paper_insights pi {scope}")
+    rows = [(doi, new) for doi, text, old in cursor.fetchall() if (new := sdg_mask(text)) != old]
+
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_sdg_mask;")
+    cursor.execute("CREATE TEMPORARY TABLE tmp_sdg_mask (doi VARCHAR(255) PRIMARY KEY, sdg_mask INT UNSIGNED);")
+    for i in range(0, len(rows), BATCH):
+        cursor.executemany("INSERT IGNORE INTO tmp_sdg_mask (doi, sdg_mask) VALUES (%s, %s)", rows[i:i + BATCH])
+    cursor.execute("""
+        UPDATE paper_insights pi
+        JOIN tmp_sdg_mask t ON t.doi = pi.doi
+        SET pi.sdg_mask = t.sdg_mask
+    """)
+    cnx.commit()
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_sdg_mask;")
+    cursor.close()
+    logging.info(f"🎯 sdg_mask updated on {len(rows)} paper_insights rows")
+    return len(rows)
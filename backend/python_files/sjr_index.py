@@ -0,0 +1,218 @@
+import hashlib
+import logging
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from issn_lookup import clean_issn
+
+# ——— LAYOUT ———
+# sjr_index/issn_keys.npy   uint32 (n,)          sorted integer-encoded ISSNs
+# sjr_index/years.npy       int16  (y,)          SJR years, ascending
+# sjr_index/quartiles.npy   uint8  (n, y)        0 = not listed, 1..4 = Q1..Q4
+# sjr_index/sjr.npy         float32 (n, y)       SJR score, NaN when not listed
+# next to this file, so the admin route (cwd backend/) and manual runs share one index
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sjr_index")
+QUARTILE_CODES = {"Q1": 1, "Q2": 2, "Q3": 3, "Q4": 4}
+QUARTILE_LABELS = np.array(["", "Q1", "Q2", "Q3", "Q4"], dtype=object)
+_ARRAYS = ("issn_keys", "years", "quartiles", "sjr")
+
+
+# ——— ISSN ENCODING ———
+def issn_key(issn):
+    """Encode a cleaned ISSN (7/8 chars, optional trailing X) as an int; -1 if malformed."""
+    if not issn:
+        return -1
+    s = str(issn).zfill(8)
+    body, check = s[:7], s[7]
+    if not body.isdigit() or not (check.isdigit() or check == "X"):
+        return -1
+    return int(body) * 11 + (10 if check == "X" else int(check))
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """sha256 of an SJR file's bytes, so a re-upload of the same file can be recognised."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def year_from_filename(filename):
+    match = re.search(r"(20\d{2})", os.path.basename(filename))
+    return int(match.group(1)) if match else None
+
+
+# ——— BUILD ———
+def parse_sjr_csv(path):
+    """Return {issn_key: (quartile_code, sjr_score)} for one scimagojr CSV."""
+    df = pd.read_csv(path, delimiter=';', encoding='utf-8-sig', usecols=['Issn', 'SJR Best Quartile', 'SJR'], dtype=str)
+    out = {}
+    for raw_issns, q, score in zip(df['Issn'], df['SJR Best Quartile'], df['SJR']):
+        code = QUARTILE_CODES.get(str(q).strip())
+        if pd.isna(raw_issns) or not code:
+            continue
+        try:
+            score = float(str(score).replace(',', '.'))
+        except ValueError:
+            score = float('nan')
+        for part in re.split(r'[^0-9A-Za-z]+', str(raw_issns)):
+            key = issn_key(clean_issn(part))
+            if key >= 0:
+                out[key] = (code, score)
+    return out
+
+
+def _write(out_dir, arrays):
+    os.makedirs(out_dir, exist_ok=True)
+    for name in _ARRAYS:
+        tmp = os.path.join(out_dir, f".{name}.tmp.npy")
+        np.save(tmp, arrays[name])
+        os.replace(tmp, os.path.join(out_dir, f"{name}.npy"))
+
+
+def build_index(files_by_year, out_dir=INDEX_DIR, base=None):
+    """Compile {year: csv_path} (merged over an existing SjrIndex, if given) into out_dir."""
+    per_year = {}
+    if base is not None:
+        for j, year in enumerate(base.years):
+            listed = base.quartiles[:, j] > 0
+            per_year[int(year)] = dict(zip(
+                base.issn_keys[listed].tolist(),
+                zip(base.quartiles[listed, j].tolist(), base.sjr[listed, j].tolist())
+            ))
+    for year, path in files_by_year.items():
+        per_year[int(year)] = parse_sjr_csv(path)
+        logging.info(f"✅ Compiled {len(per_year[int(year)])} ISSN entries from {path}")
+
+    years = np.array(sorted(per_year), dtype=np.int16)
+    keys = np.array(sorted(set().union(*per_year.values())) if per_year else [], dtype=np.uint32)
+    quartiles = np.zeros((len(keys), len(years)), dtype=np.uint8)
+    sjr = np.full((len(keys), len(years)), np.nan, dtype=np.float32)
+    for j, year in enumerate(years):
+        entries = per_year[int(year)]
+        if not entries:
+            continue
+        ks = np.fromiter(entries.keys(), dtype=np.uint32, count=len(entries))
+        rows = np.searchsorted(keys, ks)
+        values = list(entries.values())
+        quartiles[rows, j] = [v[0] for v in values]
+        sjr[rows, j] = [v[1] for v in values]
+
+    _write(out_dir, {"issn_keys": keys, "years": years, "quartiles": quartiles, "sjr": sjr})
+    logging.info(f"✅ SJR index written to {out_dir}: {len(keys)} ISSNs × years {years.tolist()}")
+    return SjrIndex.load(out_dir)
+
+
+# ——— LOOKUP ———
+class YearView:
+    """dict-like ISSN → quartile view of one SJR year (or several, first listed wins)."""
+
+    def __init__(self, index, columns):
+        self.index = index
+        self.columns = columns  # year columns, highest priority first
+
+    def get(self, issn, default=None):
+        row = self.index.row(issn)
+        if row < 0:
+            return default
+        for col in self.columns:
+            code = self.index.quartiles[row, col]
+            if code:
+                return QUARTILE_LABELS[code]
+        return default
+
+    def __getitem__(self, issn):
+        q = self.get(issn)
+        if q is None:
+            raise KeyError(issn)
+        return q
+
+    def __contains__(self, issn):
+        return self.get(issn) is not None
+
+    def __len__(self):
+        return int((self.index.quartiles[:, self.columns] > 0).any(axis=1).sum())
+
+
+class SjrIndex:
+    def __init__(self, issn_keys, years, quartiles, sjr):
+        self.issn_keys = issn_keys
+        self.years = years
+        self.quartiles = quartiles
+        self.sjr = sjr
+
+    @classmethod
+    def load(cls, path=INDEX_DIR, mmap=True):
+        mode = "r" if mmap else None
+        return cls(*(np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in _ARRAYS))
+
+    @classmethod
+    def load_or_build(cls, files_by_year, path=INDEX_DIR, refresh=()):
+        """
+        Load the index, compiling any of files_by_year's years it does not cover yet
+        (and recompiling the years in refresh, e.g. because their file changed).
+        """
+        index = cls.load(path) if os.path.exists(os.path.join(path, "years.npy")) else None
+        have = set(index.years.tolist()) if index is not None else set()
+        missing = {y: f for y, f in files_by_year.items()
+                   if (y not in have or y in refresh) and os.path.exists(f)}
+        if missing:
+            # rebuild from an in-memory copy so no mapping is open while the files are replaced
+            base = cls.load(path, mmap=False) if index is not None else None
+            del index
+            index = build_index(missing, path, base=base)
+        return index
+
+    @classmethod
+    def add_year(cls, csv_path, year, path=INDEX_DIR):
+        """(Re)compile one uploaded SJR year into the index."""
+        base = cls.load(path, mmap=False) if os.path.exists(os.path.join(path, "years.npy")) else None
+        return build_index({year: csv_path}, path, base=base)
+
+    def has_year(self, year):
+        return bool((self.years == year).any())
+
+    def column(self, year):
+        matches = np.nonzero(self.years == year)[0]
+        if not len(matches):
+            raise KeyError(f"SJR year {year} is not in the index")
+        return int(matches[0])
+
+    def row(self, issn):
+        key = issn_key(issn)
+        if key < 0:
+            return -1
+        i = int(np.searchsorted(self.issn_keys, key))
+        return i if i < len(self.issn_keys) and self.issn_keys[i] == key else -1
+
+    def rows(self, keys):
+        """Vectorized row lookup for an array of issn_key values; -1 where absent."""
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(self.issn_keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        i = np.searchsorted(self.issn_keys, np.clip(keys, 0, None))
+        i = np.minimum(i, len(self.issn_keys) - 1)
+        hit = (keys >= 0) & (self.issn_keys[i] == keys)
+        return np.where(hit, i, -1)
+
+    def year(self, year):
+        """ISSN → quartile view for one year (empty if that year was never compiled)."""
+        if not self.has_year(year):
+            logging.error(f"❌ SJR year {year} is not in the index")
+            return YearView(self, [])
+        return YearView(self, [self.column(year)])
+
+
+# ——— BUILD STEP ———
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s - %(message)s')
+    paths = sys.argv[1:] or sorted(f for f in os.listdir(".") if re.match(r"scimagojr\d{4}\.csv$", f))
+    if not paths:
+        print("Usage: python sjr_index.py [scimagojr2024.csv ...]")
+        sys.exit(1)
+    build_index({year_from_filename(p): p for p in paths})
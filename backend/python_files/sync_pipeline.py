@@ -0,0 +1,208 @@
+import logging
+import queue
+import threading
+import time
+
+# ——— DEFAULTS ———
+FETCH_WORKERS = 4
+QUEUE_SIZE = 64         # bounded queues give backpressure between stages
+BATCH_SIZE = 200        # rows per writer round trip / commit
+FLUSH_INTERVAL = 2.0    # seconds a partial batch may wait before it is written
+REPORT_INTERVAL = 10.0  # seconds between stage reports
+
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items, seconds, errors=0):
+        with self._lock:
+            self.items += items
+            self.busy += seconds
+            self.errors += errors
+
+    def as_dict(self, elapsed):
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "busy_s": round(self.busy, 2),
+            "per_s": round(self.items / elapsed, 2) if elapsed else None,
+        }
+
+
+class SyncPipeline:
+    """
+    fetch workers → transform → single batching writer, connected by bounded queues.
+
+    fetch_fn(job)             runs on FETCH_WORKERS threads (network I/O), returns a payload or None
+    transform_fn(job, data)   runs on one thread, yields rows for the writer
+    write_fn(rows)            runs on one thread with its own DB connection, writes and commits a batch;
+                              the first exception stops the pipeline and is re-raised by run()
+    progress_fn(done, total)  optional, called from the transform thread after each job
+    report_fn(stats)          optional, called every REPORT_INTERVAL seconds and once at the end
+    """
+
+    def __init__(self, fetch_fn, transform_fn, write_fn, progress_fn=None, report_fn=None,
+                 fetch_workers=FETCH_WORKERS, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, report_interval=REPORT_INTERVAL):
+        self.fetch_fn = fetch_fn
+        self.transform_fn = transform_fn
+        self.write_fn = write_fn
+        self.progress_fn = progress_fn
+        self.report_fn = report_fn
+        self.fetch_workers = fetch_workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.report_interval = report_interval
+
+        self.job_q = queue.Queue()
+        self.fetched_q = queue.Queue(maxsize=queue_size)
+        self.row_q = queue.Queue(maxsize=queue_size * batch_size)
+        self.stages = {name: StageStats(name) for name in ("fetch", "transform", "write")}
+        self.max_depth = {"fetched": 0, "rows": 0}
+        self._writer_error = None
+        self._stop = threading.Event()      # set on the first writer error: no point fetching more
+        self._finished = threading.Event()
+        self._started = None
+
+    # ---------- stages ----------
+
+    def _fetch_worker(self):
+        stats = self.stages["fetch"]
+        while True:
+            job = self.job_q.get()
+            if job is _DONE:
+                self.fetched_q.put(_DONE)
+                return
+            if self._stop.is_set():
+                continue
+            start = time.monotonic()
+            try:
+                data = self.fetch_fn(job)
+                stats.add(1, time.monotonic() - start)
+            except Exception as e:
+                logging.warning(f"Fetch failed for {job!r}: {e}", exc_info=True)
+                data = None
+                stats.add(0, time.monotonic() - start, errors=1)
+            self.fetched_q.put((job, data))
+
+    def _transform(self, total):
+        stats = self.stages["transform"]
+        remaining_workers = self.fetch_workers
+        done = 0
+        try:
+            while remaining_workers:
+                item = self.fetched_q.get()
+                if item is _DONE:
+                    remaining_workers -= 1
+                    continue
+                job, data = item
+                start = time.monotonic()
+                rows = 0
+                errors = 0
+                if data is not None and not self._stop.is_set():
+                    try:
+                        for row in self.transform_fn(job, data):
+                            self.row_q.put(row)
+                            rows += 1
+                    except Exception as e:
+                        # one bad payload must not take the stage down; rows already yielded stay queued
+                        logging.warning(f"Transform failed for {job!r}: {e}")
+                        errors = 1
+                stats.add(rows, time.monotonic() - start, errors=errors)
+                done += 1
+                if self.progress_fn:
+                    self.progress_fn(done, total)
+        finally:
+            # drain and always hand the writer its end marker, so run() can never hang on join
+            while remaining_workers:
+                if self.fetched_q.get() is _DONE:
+                    remaining_workers -= 1
+            self.row_q.put(_DONE)
+
+    def _flush(self, batch):
+        if not batch or self._writer_error:
+            return
+        start = time.monotonic()
+        try:
+            self.write_fn(batch)
+            self.stages["write"].add(len(batch), time.monotonic() - start)
+        except Exception as e:
+            # stop fetching and keep draining, so upstream stages wind down instead of blocking
+            logging.error(f"Write of {len(batch)} rows failed, stopping the pipeline: {e}")
+            self._writer_error = e
+            self._stop.set()
+            self.stages["write"].add(0, time.monotonic() - start, errors=len(batch))
+
+    def _writer(self):
+        batch = []
+        last_flush = time.monotonic()
+        while True:
+            try:
+                row = self.row_q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                row = None
+            if row is _DONE:
+                self._flush(batch)
+                return
+            if row is not None:
+                batch.append(row)
+            if len(batch) >= self.batch_size or (batch and time.monotonic() - last_flush >= self.flush_interval):
+                self._flush(batch)
+                batch = []
+                last_flush = time.monotonic()
+
+    def _monitor(self):
+        while not self._finished.wait(self.report_interval / 4):
+            self._sample_depths()
+            if self.report_fn and time.monotonic() - self._last_report >= self.report_interval:
+                self._last_report = time.monotonic()
+                self.report_fn(self.stats())
+
+    # ---------- driver ----------
+
+    def _sample_depths(self):
+        self.max_depth["fetched"] = max(self.max_depth["fetched"], self.fetched_q.qsize())
+        self.max_depth["rows"] = max(self.max_depth["rows"], self.row_q.qsize())
+
+    def stats(self):
+        elapsed = time.monotonic() - self._started if self._started else 0
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "stages": {name: s.as_dict(elapsed) for name, s in self.stages.items()},
+            "queue_depth": {"fetched": self.fetched_q.qsize(), "rows": self.row_q.qsize()},
+            "max_queue_depth": dict(self.max_depth),
+        }
+
+    def run(self, jobs):
+        """Run every job through the pipeline; returns the final stats dict."""
+        jobs = list(jobs)
+        for job in jobs:
+            self.job_q.put(job)
+        for _ in range(self.fetch_workers):
+            self.job_q.put(_DONE)
+
+        self._started = self._last_report = time.monotonic()
+        threads = [threading.Thread(target=self._fetch_worker, daemon=True) for _ in range(self.fetch_workers)]
+        threads.append(threading.Thread(target=self._transform, args=(len(jobs),), daemon=True))
+        writer = threading.Thread(target=self._writer, daemon=True)
+        monitor = threading.Thread(target=self._monitor, daemon=True)
+        for t in threads + [writer, monitor]:
+            t.start()
+        for t in threads + [writer]:
+            t.join()
+        self._finished.set()
+        monitor.join()
+
+        stats = self.stats()
+        if self.report_fn:
+            self.report_fn(stats)
+        if self._writer_error:
+            raise self._writer_error
+        return stats
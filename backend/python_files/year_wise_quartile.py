@@ -1,11 +1,16 @@
-import time
-import re
-import requests
-import pandas as pd
+import os
+import sys
 import mysql.connector
-from collections import defaultdict
 import logging
 
+from issn_lookup import ensure_issn_columns, IssnResolver
+from journals import ensure_journal_tables, journal_sjr_frame
+from sjr_index import SjrIndex, file_fingerprint
+from quartile_matcher import load_papers, has_issn, match_quartiles, missing_quartile_where
+from quartile_writer import (QUARTILE_TABLE, create_quartile_table, bulk_upsert_year_quartiles, swap_in_shadow,
+                             table_write_lock, create_applied_table, changed_years, mark_applied,
+                             bulk_upsert_journal_sjr)
+
 # ——— SETUP LOGGING ———
 logging.basicConfig(
     level=logging.INFO,
@@ -29,46 +34,14 @@ SJR_FILES = {
     2023: 'scimagojr2023.csv',
     2024: 'scimagojr2024.csv'
 }
+APPLIED_TARGET = f"{QUARTILE_TABLE}:scimagojr"
 
-CROSSREF_BASE = "https://api.crossref.org/works/"
-
-# ——— HELPERS ———
-def clean_issn(raw):
-    if pd.isna(raw): return None
-    s = str(raw).replace('-', '').strip().upper()
-    return s if len(s) in (7, 8) else None
-
-def fetch_first_issn(doi):
-    try:
-        url = CROSSREF_BASE + doi
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        issns = r.json().get('message', {}).get('ISSN', [])
-        for i in issns:
-            c = clean_issn(i)
-            if c:
-                return c
-    except Exception as e:
-        logging.warning(f"[CrossRef] Failed to fetch ISSN for DOI {doi}: {e}")
-    return None
+# --full rebuilds every paper; otherwise, when none of SJR_FILES changed since they were
+# last applied, only papers missing a quartile for one of the years are matched.
+FULL = "--full" in sys.argv
+fingerprints = {y: file_fingerprint(f) for y, f in SJR_FILES.items() if os.path.exists(f)}
 
-# ——— 1. Load SJR Files into ISSN→Quartile Maps ———
-yearly_issn_quart = defaultdict(dict)
-
-for year, filename in SJR_FILES.items():
-    try:
-        df = pd.read_csv(filename, delimiter=';', encoding='utf-8-sig')
-        for raw_issns, q in zip(df['Issn'], df['SJR Best Quartile']):
-            if pd.isna(raw_issns) or pd.isna(q): continue
-            for part in re.split(r'[^0-9A-Za-z]+', str(raw_issns)):
-                issn = clean_issn(part)
-                if issn:
-                    yearly_issn_quart[year][issn] = q
-        logging.info(f"✅ Loaded {len(yearly_issn_quart[year])} ISSN→Quartile entries for {year}")
-    except Exception as e:
-        logging.error(f"❌ Failed to load {filename}: {e}")
-
-# ——— 2. Connect to MySQL ———
+# ——— 1. Connect to MySQL ———
 try:
     cnx = mysql.connector.connect(**DB_CONFIG)
     logging.info("Connected to MySQL.")
@@ -77,66 +50,59 @@ except mysql.connector.Error as err:
     exit(1)
 
 cursor = cnx.cursor()
-
-# ——— 3. Drop & Recreate Table ———
-cursor.execute("DROP TABLE IF EXISTS faculty_quartile_summary")
-cursor.execute("""
-CREATE TABLE faculty_quartile_summary (
-  scopus_id VARCHAR(50),
-  doi VARCHAR(255),
-  quartile_2024 VARCHAR(2),
-  quartile_2023 VARCHAR(2),
-  quartile_2022 VARCHAR(2),
-  PRIMARY KEY (doi)
-);
-""")
+create_quartile_table(cursor)
+create_applied_table(cursor)
 cnx.commit()
-
-# ——— 4. Fetch DOIs ———
-cursor.execute("SELECT scopus_id, doi FROM papers WHERE doi IS NOT NULL;")
-papers = cursor.fetchall()
+changed = changed_years(cursor, APPLIED_TARGET, fingerprints)
+incremental = not FULL and not changed
+logging.info(f"Mode: {'incremental' if incremental else 'full rebuild'} (changed SJR years: {changed or 'none'})")
+
+# ——— 2. Load the compiled SJR index ———
+sjr = SjrIndex.load_or_build(SJR_FILES, refresh=changed)
+for year in SJR_FILES:
+    logging.info(f"✅ Loaded {len(sjr.year(year))} ISSN→Quartile entries for {year}")
+
+# ——— 3. Fetch papers (ISSNs from sync time, else cache / CrossRef) ———
+ensure_issn_columns(cursor)
+ensure_journal_tables(cursor)
+resolver = IssnResolver(cnx)
+papers = load_papers(cursor, resolver, where=missing_quartile_where(SJR_FILES, QUARTILE_TABLE)) \
+    if incremental else load_papers(cursor, resolver)
 logging.info(f"Fetched {len(papers)} papers with DOIs.")
 
-# ——— 5. Process and Insert One by One ———
-insert_sql = """
-INSERT INTO faculty_quartile_summary (scopus_id, doi, quartile_2024, quartile_2023, quartile_2022)
-VALUES (%s, %s, %s, %s, %s)
-"""
-
-for idx, (scopus_id, doi) in enumerate(papers, 1):
-    if not doi:
-        continue
-
-    issn = fetch_first_issn(doi)
-    if not issn:
-        logging.warning(f"[{idx}] No ISSN found for DOI {doi}")
-        continue
-
-    quartiles = {}
-    for year in [2024, 2023, 2022]:
-        quart = yearly_issn_quart[year].get(issn)
-        quartiles[year] = quart if quart else None
-
-    try:
-        cursor.execute(insert_sql, (
-            scopus_id,
-            doi,
-            quartiles[2024],
-            quartiles[2023],
-            quartiles[2022]
-        ))
+# ——— 4. Match every paper for every year in one pass ———
+result = match_quartiles(papers, sjr, SJR_FILES)
+missing = ~has_issn(result)
+for doi in result.loc[missing, "doi"]:
+    logging.warning(f"No ISSN found for DOI {doi}")
+result = result[~missing].drop_duplicates("doi", keep="first")
+
+# ——— 5. Write: new rows straight into the live table, or rebuild in a shadow table ———
+if incremental:
+    bulk_upsert_year_quartiles(cnx, result, list(SJR_FILES))
+else:
+    # The live paper_quartile stays readable until the atomic RENAME.
+    shadow = f"{QUARTILE_TABLE}_shadow"
+    cursor.execute(f"DROP TABLE IF EXISTS {shadow}")
+    create_quartile_table(cursor, shadow)
+    bulk_upsert_year_quartiles(cnx, result, list(SJR_FILES), table=shadow)
+    # only the SJR_FILES years are rebuilt; years from quartiles_update.py or the
+    # wide-table migration are carried over unchanged. The lock keeps quartiles_update.py
+    # from writing to the live table between this copy and the swap.
+    with table_write_lock(cnx, QUARTILE_TABLE):
+        cursor.execute(f"""
+            INSERT INTO {shadow} (doi, sjr_year, scopus_id, quartile)
+            SELECT doi, sjr_year, scopus_id, quartile FROM {QUARTILE_TABLE}
+            WHERE sjr_year NOT IN ({', '.join(['%s'] * len(SJR_FILES))})
+        """, list(SJR_FILES))
+        logging.info(f"Carried over {cursor.rowcount} {QUARTILE_TABLE} rows for other SJR years.")
         cnx.commit()
-        logging.info(f"[{idx}] Inserted {doi} → 2024:{quartiles[2024]} 2023:{quartiles[2023]} 2022:{quartiles[2022]}")
-    except mysql.connector.errors.IntegrityError as e:
-        if e.errno == 1062:
-            logging.warning(f"[{idx}] Skipped duplicate DOI: {doi}")
-        else:
-            logging.error(f"[{idx}] Failed to insert {doi}: {e}")
-
-    if idx % 50 == 0:
-        time.sleep(1)  # CrossRef throttle
+        swap_in_shadow(cnx, QUARTILE_TABLE)
+bulk_upsert_journal_sjr(cnx, journal_sjr_frame(cursor, sjr, SJR_FILES))
+mark_applied(cnx, APPLIED_TARGET, fingerprints, SJR_FILES)
 
 # ——— 6. Cleanup ———
+resolver.close()
 cursor.close()
 cnx.close()
 logging.info("Closed MySQL connection.")
@@ -5,6 +5,7 @@ const { spawn } = require("child_process");
 const multer = require("multer");
 const fs = require("fs");
 const db = require('../config/db');
+const { attributeFaculty } = require('../utils/derivedTables');
 
 const upload = multer({ dest: "uploads/" });
 
@@ -533,6 +534,11 @@ router.post("/approve-author/:id", express.json(), async (req, res) => {
                                     });
                                 }
 
+                                // Attribute papers already on file for this Scopus ID; not fatal, the next sync rebuilds it
+                                attributeFaculty(db, author.faculty_id, author.scopus_id, attrErr => {
+                                    if (attrErr) console.error("Error attributing papers:", attrErr);
+                                });
+
                                 res.json({
                                     success: true,
                                     message: `Author ${author.faculty_name} approved and added to database`,
@@ -1,55 +1,71 @@
 const express = require('express');
 const router = express.Router();
 const db = require('../config/db');
+const { sdgCountColumns, countsFromRow } = require('../utils/sdgMask');
 
 // Route: GET /api/insights/countries
+// country_paper_count is rebuilt by the SciVal ingest from the exploded paper_country table
 router.get('/countries', (req, res) => {
-    db.query('SELECT country_list FROM paper_insights', (err, rows) => {
-        if (err) {
-            console.error('Error fetching country data:', err);
-            return res.status(500).json({ error: 'Failed to fetch country data' });
-        }
+    db.query(
+        'SELECT country, paper_count AS count FROM country_paper_count ORDER BY paper_count DESC',
+        (err, rows) => {
+            if (err) {
+                console.error('Error fetching country data:', err);
+                return res.status(500).json({ error: 'Failed to fetch country data' });
+            }
 
-        if (!rows || rows.length === 0) {
-            return res.json([]);
+            res.json(rows || []);
         }
+    );
+});
 
-        const countryCounts = {};
-
-        rows.forEach((row, i) => {
-            const list = row.country_list;
-
-            if (list) {
-                const countries = list.split(/[|,]/).map(c => c.trim());
-                countries.forEach(country => {
-                    if (country) {
-                        countryCounts[country] = (countryCounts[country] || 0) + 1;
-                    }
-                });
+// Route: GET /api/insights/collaborations?year=2024&sdg=3 (year=0 / sdg=0: all years / all SDGs)
+// Sparse country x country co-authorship counts precomputed by country_collaboration.py
+// after each SciVal upload; the diagonal (country_a = country_b) is the country's own total.
+router.get('/collaborations', (req, res) => {
+    const year = parseInt(req.query.year, 10) || 0;
+    const sdg = parseInt(req.query.sdg, 10) || 0;
+    if (sdg < 0 || sdg > 17) {
+        return res.status(400).json({ error: 'sdg must be between 0 (all SDGs) and 17' });
+    }
+
+    db.query(
+        `SELECT country_a, country_b, paper_count
+         FROM country_collaboration
+         WHERE pub_year = ? AND sdg = ?`,
+        [year, sdg],
+        (err, rows) => {
+            if (err) {
+                console.error('Error fetching collaboration data:', err);
+                return res.status(500).json({ error: 'Failed to fetch collaboration data' });
             }
-        });
 
-        const formatted = Object.entries(countryCounts)
-            .map(([country, count]) => ({ country, count }))
-            .sort((a, b) => b.count - a.count);
+            const countries = [];
+            const links = [];
+            (rows || []).forEach(r => {
+                if (r.country_a === r.country_b) {
+                    countries.push({ country: r.country_a, count: r.paper_count });
+                } else {
+                    links.push({ source: r.country_a, target: r.country_b, count: r.paper_count });
+                }
+            });
+            countries.sort((a, b) => b.count - a.count);
+            links.sort((a, b) => b.count - a.count);
 
-        res.json(formatted);
-    });
+            res.json({ year, sdg, countries, links });
+        }
+    );
 });
 
 // routes/insights.js
 // Route: GET /api/insights/sdg-counts
 router.get('/sdg-counts', (req, res) => {
-    db.query('SELECT sustainable_development_goals FROM paper_insights', (err, rows) => {
+    db.query(`SELECT ${sdgCountColumns()} FROM paper_insights WHERE sdg_mask <> 0`, (err, rows) => {
         if (err) {
             console.error('Error fetching SDG data:', err);
             return res.status(500).json({ error: 'Failed to fetch SDG data' });
         }
 
-        if (!rows || rows.length === 0) {
-            return res.json({});
-        }
-
         const sdgMap = {
             '1': 'No Poverty',
             '2': 'Zero Hunger',
@@ -70,21 +86,7 @@ router.get('/sdg-counts', (req, res) => {
             '17': 'Partnerships for the Goals'
         };
 
-        const sdgCounts = {};
-
-        rows.forEach(row => {
-            const field = row.sustainable_development_goals;
-            if (!field) return;
-
-            const sdgs = field.split(/[|,]/).map(s => s.trim()).filter(Boolean);
-
-            sdgs.forEach(sdg => {
-                const label = sdgMap[sdg] || sdg;
-                sdgCounts[label] = (sdgCounts[label] || 0) + 1;
-            });
-        });
-
-        res.json(sdgCounts);
+        res.json(countsFromRow(rows[0], k => sdgMap[k] || `SDG ${k}`));
     });
 });
 
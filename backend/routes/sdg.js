@@ -2,6 +2,7 @@ const express = require('express');
 const router = express.Router();
 const mysql = require('mysql2');
 const dotenv = require('dotenv');
+const { sdgCountColumns, countsFromRow } = require('../utils/sdgMask');
 dotenv.config();
 
 const db = mysql.createConnection({
@@ -12,28 +13,14 @@ const db = mysql.createConnection({
     port: process.env.port || 3307 // default port
 });
 
+// Per-SDG counts in one pass over the integer sdg_mask column
 router.get('/sdg-count', (req, res) => {
-    const query = 'SELECT sustainable_development_goals FROM paper_insights';
+    const query = `SELECT ${sdgCountColumns()} FROM paper_insights WHERE sdg_mask <> 0`;
 
     db.query(query, (err, results) => {
         if (err) return res.status(500).json({ error: err.message });
 
-        const counts = {};
-
-        results.forEach(row => {
-            if (row.sustainable_development_goals) {
-                const sdgs = row.sustainable_development_goals
-                    .split('|') // assuming delimiter is "|"
-                    .map(sdg => sdg.trim())
-                    .filter(sdg => sdg !== '-' && sdg !== ''); // exclude '-' and empty strings
-
-                sdgs.forEach(sdg => {
-                    counts[sdg] = (counts[sdg] || 0) + 1;
-                });
-            }
-        });
-
-        res.json(counts);
+        res.json(countsFromRow(results[0]));
     });
 });
 
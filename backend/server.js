@@ -5,6 +5,8 @@ const helmet = require('helmet');
 const rateLimit = require('./middleware/rateLimitMiddleware');
 const validation = require('./middleware/validationMiddleware');
 const logging = require('./middleware/loggingMiddleware');
+const db = require('./config/db');
+const { ensureDerivedTables } = require('./utils/derivedTables');
 
 const app = express();
 const PORT = 5001;
@@ -91,6 +93,9 @@ app.use((err, req, res, next) => {
   });
 });
 
+// Derived tables (paper_faculty, country_paper_count, ...) must exist before routes query them
+ensureDerivedTables(db);
+
 app.listen(PORT, () => {
   console.log(`🚀 Server running on port ${PORT}`);
   console.log(`📊 Environment: ${process.env.NODE_ENV || 'development'}`);
@@ -0,0 +1,160 @@
+const path = require('path');
+const { spawn } = require('child_process');
+const { sdgMaskSql } = require('./sdgMask');
+
+// Tables the Python jobs derive from papers / paper_insights (python_files/paper_countries.py,
+// sdg_mask.py, country_collaboration.py, faculty_attribution.py, quartile_writer.py, journals.py).
+// They are created empty at startup so the API answers with empty results instead of
+// ER_NO_SUCH_TABLE on a deployment where those jobs have not run yet; db_thingies/
+// derived_tables_migrate.py and db_thingies/quartile_long_migrate.py backfill them.
+
+const CREATE_TABLES = [
+    `CREATE TABLE IF NOT EXISTS journals (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        name_norm VARCHAR(255) NOT NULL,
+        issn CHAR(8) NULL,
+        eissn CHAR(8) NULL,
+        UNIQUE KEY uq_journal_issn (issn),
+        UNIQUE KEY uq_journal_eissn (eissn),
+        KEY idx_journal_name_norm (name_norm)
+    )`,
+    `CREATE TABLE IF NOT EXISTS journal_sjr (
+        journal_id INT NOT NULL,
+        sjr_year SMALLINT NOT NULL,
+        quartile CHAR(2) NULL,
+        sjr FLOAT NULL,
+        PRIMARY KEY (journal_id, sjr_year),
+        KEY idx_journal_sjr_year_quartile (sjr_year, quartile)
+    )`,
+    `CREATE TABLE IF NOT EXISTS paper_quartile (
+        doi VARCHAR(255) NOT NULL,
+        sjr_year SMALLINT NOT NULL,
+        scopus_id VARCHAR(50),
+        quartile CHAR(2) NOT NULL,
+        PRIMARY KEY (doi, sjr_year),
+        KEY idx_year_quartile (sjr_year, quartile)
+    )`,
+    `CREATE TABLE IF NOT EXISTS paper_country (
+        doi VARCHAR(255) NOT NULL,
+        country VARCHAR(100) NOT NULL,
+        PRIMARY KEY (doi, country),
+        KEY idx_paper_country_country (country)
+    )`,
+    `CREATE TABLE IF NOT EXISTS country_paper_count (
+        country VARCHAR(100) PRIMARY KEY,
+        paper_count INT NOT NULL,
+        updated_at DATETIME NOT NULL
+    )`,
+    `CREATE TABLE IF NOT EXISTS country_collaboration (
+        pub_year SMALLINT NOT NULL,
+        sdg TINYINT NOT NULL,
+        country_a VARCHAR(100) NOT NULL,
+        country_b VARCHAR(100) NOT NULL,
+        paper_count INT NOT NULL,
+        PRIMARY KEY (pub_year, sdg, country_a, country_b)
+    )`,
+    `CREATE TABLE IF NOT EXISTS paper_faculty (
+        doi VARCHAR(255) NOT NULL,
+        faculty_id VARCHAR(50) NOT NULL,
+        author_position ENUM('first', 'corresponding', 'author') NOT NULL,
+        PRIMARY KEY (doi, faculty_id, author_position),
+        KEY idx_paper_faculty_faculty (faculty_id, author_position)
+    )`
+];
+
+// Add table.column (alterSpec is the ALTER TABLE body) when the table exists without it, then
+// call onReady(added) once the column is there, so the caller can backfill it.
+function ensureColumn(db, table, column, alterSpec, onReady = () => {}) {
+    db.query(
+        `SELECT
+            (SELECT COUNT(*) FROM information_schema.TABLES
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ?) AS has_table,
+            (SELECT COUNT(*) FROM information_schema.COLUMNS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ? AND COLUMN_NAME = ?) AS has_column`,
+        [table, table, column],
+        (err, rows) => {
+            if (err || !rows[0].has_table) {
+                if (err) console.error(`Error checking ${table}.${column}:`, err);
+                return;
+            }
+            if (rows[0].has_column) return onReady(false);
+            db.query(`ALTER TABLE ${table} ${alterSpec}`, alterErr => {
+                if (alterErr) return console.error(`Error adding ${table}.${column}:`, alterErr);
+                console.log(`Added ${table}.${column}`);
+                onReady(true);
+            });
+        }
+    );
+}
+
+// The SDG read paths only test sdg_mask, so rows still at 0 despite an SDG string (the column
+// was just added, or rows were written by code that predates it) are filled in before use.
+function backfillSdgMask(db) {
+    db.query(
+        `UPDATE paper_insights
+         SET sdg_mask = ${sdgMaskSql('sustainable_development_goals')}
+         WHERE sdg_mask = 0 AND TRIM(IFNULL(sustainable_development_goals, '')) NOT IN ('', '-')`,
+        (err, result) => {
+            if (err) return console.error('Error backfilling paper_insights.sdg_mask:', err);
+            if (result.changedRows) console.log(`✔ Backfilled sdg_mask on ${result.changedRows} paper_insights rows`);
+        }
+    );
+}
+
+// Run a db_thingies backfill script in the background, logging how it ended
+function runBackfill(script) {
+    const proc = spawn('python3', [path.join(__dirname, '../db_thingies', script)]);
+    proc.stderr.on('data', data => console.error(`${script}:`, data.toString().trim()));
+    proc.on('error', err => console.error(`Could not start ${script}:`, err));
+    proc.on('close', code => {
+        if (code === 0) console.log(`✔ ${script} finished`);
+        else console.error(`❌ ${script} exited with code ${code}`);
+    });
+}
+
+exports.ensureDerivedTables = (db) => {
+    CREATE_TABLES.forEach(sql => {
+        db.query(sql, err => {
+            if (err) console.error('Error creating derived table:', err);
+        });
+    });
+    ensureColumn(db, 'paper_insights', 'sdg_mask', 'ADD COLUMN sdg_mask INT UNSIGNED NOT NULL DEFAULT 0',
+        () => backfillSdgMask(db));
+    // papers synced before journals existed are linked by journal_backfill.py
+    ensureColumn(db, 'papers', 'journal_id', 'ADD COLUMN journal_id INT NULL, ADD KEY idx_papers_journal (journal_id)',
+        added => added && runBackfill('journal_backfill.py'));
+};
+
+// Attribute the papers already on file to a newly added faculty member, mirroring
+// faculty_attribution.py: SciVal author ID cells ('|' separated) that contain the Scopus ID.
+// scopus_author_ids is added by the first SciVal upload that carries it, so it is only
+// matched once present.
+const FACULTY_POSITIONS = [
+    ['scopus_author_ids', 'author'],
+    ['scopus_author_id_first', 'first'],
+    ['scopus_author_id_corresponding', 'corresponding']
+];
+
+exports.attributeFaculty = (db, facultyId, scopusId, callback = () => {}) => {
+    const idPattern = `%|${String(scopusId).trim()}|%`;
+    db.query(
+        `SELECT COLUMN_NAME AS name FROM information_schema.COLUMNS
+         WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'paper_insights' AND COLUMN_NAME IN (?)`,
+        [FACULTY_POSITIONS.map(([column]) => column)],
+        (err, rows) => {
+            if (err) return callback(err);
+            const present = new Set(rows.map(r => r.name));
+            const positions = FACULTY_POSITIONS.filter(([column]) => present.has(column));
+            if (!positions.length) return callback(null);
+            db.query(
+                `INSERT IGNORE INTO paper_faculty (doi, faculty_id, author_position)
+                 ${positions.map(([column, position]) =>
+                    `SELECT doi, ?, '${position}' FROM paper_insights
+                     WHERE CONCAT('|', REPLACE(${column}, ' ', ''), '|') LIKE ?`).join('\n UNION\n')}`,
+                positions.flatMap(() => [facultyId, idPattern]),
+                callback
+            );
+        }
+    );
+};
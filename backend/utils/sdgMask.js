@@ -0,0 +1,38 @@
+// paper_insights.sdg_mask: bit k-1 is set when a paper is tagged with SDG k (k = 1..17).
+// Maintained by the SciVal ingest and sdg_classfier.py (python_files/sdg_mask.py).
+const SDG_COUNT = 17;
+
+// One SUM per SDG, so every per-SDG count comes from a single pass over an integer column
+const sdgCountColumns = (column = 'sdg_mask') =>
+    Array.from({ length: SDG_COUNT }, (_, i) => `SUM((${column} >> ${i}) & 1) AS sdg_${i + 1}`).join(',\n');
+
+// SQL computing sdg_mask from an "SDG 3| SDG 9| SDG 13" column, for rows written before the
+// mask existed; like sdg_mask.py's parse_sdgs, a standalone number 1..17 sets its bit
+const sdgMaskSql = (column) =>
+    Array.from({ length: SDG_COUNT }, (_, i) =>
+        `IF(${column} REGEXP '(^|[^0-9])${i + 1}([^0-9]|$)', ${2 ** i}, 0)`).join(' + ');
+
+// Row from a sdgCountColumns() query → { 'SDG 3': 12, ... } (SDGs with no papers omitted)
+const countsFromRow = (row, label = k => `SDG ${k}`) => {
+    const counts = {};
+    for (let k = 1; k <= SDG_COUNT; k++) {
+        const count = Number(row?.[`sdg_${k}`]) || 0;
+        if (count > 0) counts[label(k)] = count;
+    }
+    return counts;
+};
+
+// Filter for "papers tagged with this SDG": "SDG 3" / "3" becomes a bit test on sdg_mask
+// (the old LIKE '%sdg3%' also matched SDG 13); anything else keeps the string match.
+const sdgFilter = (sdg, alias = 'pi') => {
+    const k = parseInt(String(sdg).replace(/\D+/g, ''));
+    if (k >= 1 && k <= SDG_COUNT) {
+        return { clause: `(${alias}.sdg_mask & ?) <> 0`, param: 1 << (k - 1) };
+    }
+    return {
+        clause: `REPLACE(LOWER(${alias}.sustainable_development_goals), ' ', '') LIKE ?`,
+        param: `%${String(sdg).toLowerCase().replace(/\s+/g, '')}%`
+    };
+};
+
+module.exports = { SDG_COUNT, sdgCountColumns, sdgMaskSql, countsFromRow, sdgFilter };